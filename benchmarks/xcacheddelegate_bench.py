@@ -0,0 +1,108 @@
+"""
+Compares scrolling a large table through a plain QStyledItemDelegate and
+through XCachedItemDelegate with the same expensive paint routine.
+
+Each frame scrolls the view and renders its viewport into an image, so no
+window is shown.  Qt 4 has no offscreen platform and a QApplication still
+needs a display, so run this under Xvfb on headless machines.
+
+usage: python benchmarks/xcacheddelegate_bench.py [frames] [rows]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xqt import QtCore, QtGui
+from xqt.gui.xcacheddelegate import XCachedItemDelegate
+
+
+def paintExpensive(painter, option, index):
+    """
+    Draws a gradient badge and several passes of text for the cell.  Only
+    the display text is used, since that is all the cached delegate's
+    fingerprint covers.
+    """
+    rect = option.rect
+    text = index.data(QtCore.Qt.DisplayRole)
+    gradient = QtGui.QLinearGradient(QtCore.QPointF(rect.topLeft()), QtCore.QPointF(rect.bottomRight()))
+    gradient.setColorAt(0, QtGui.QColor.fromHsv(hash(unicode(text)) % 360, 120, 250))
+    gradient.setColorAt(1, QtGui.QColor(255, 255, 255))
+
+    painter.save()
+    painter.setRenderHint(QtGui.QPainter.Antialiasing)
+    painter.fillRect(rect, QtGui.QBrush(gradient))
+    painter.setPen(QtGui.QColor(60, 60, 60))
+    painter.drawRoundedRect(rect.adjusted(2, 2, -2, -2), 4, 4)
+    for offset in range(4):
+        painter.drawText(rect.adjusted(6 + offset, 2, -6, -2),
+                         QtCore.Qt.AlignVCenter | QtCore.Qt.AlignLeft,
+                         text)
+    painter.restore()
+
+class PlainDelegate(QtGui.QStyledItemDelegate):
+    def paint(self, painter, option, index):
+        paintExpensive(painter, option, index)
+
+class CachedDelegate(XCachedItemDelegate):
+    def paintCell(self, painter, option, index):
+        paintExpensive(painter, option, index)
+
+#----------------------------------------------------------------------
+
+def buildModel(rows, columns):
+    model = QtGui.QStandardItemModel(rows, columns)
+    for row in range(rows):
+        for column in range(columns):
+            # repeat values so cells share cached renders, as real data does
+            model.setItem(row, column, QtGui.QStandardItem('item {0}'.format((row * columns + column) % 500)))
+    return model
+
+def scroll(view, frames):
+    """ Scrolls down and back up, rendering each frame into an image """
+    bar = view.verticalScrollBar()
+    image = QtGui.QImage(view.viewport().size(), QtGui.QImage.Format_ARGB32_Premultiplied)
+    step = max(1, bar.maximum() / frames)
+
+    start = time.time()
+    for frame in range(frames):
+        bar.setValue((frame * step) % (bar.maximum() + 1))
+        painter = QtGui.QPainter(image)
+        view.viewport().render(painter)
+        painter.end()
+    return frames / (time.time() - start)
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    app = QtGui.QApplication([])
+    model = buildModel(rows, 6)
+
+    results = {}
+    for name, cls in (('plain', PlainDelegate), ('cached', CachedDelegate)):
+        view = QtGui.QTableView()
+        view.resize(1024, 768)
+        view.setModel(model)
+        view.setItemDelegate(cls(view))
+        view.verticalHeader().setDefaultSectionSize(24)
+
+        # the first pass fills the cache, the second shows the steady state
+        first = scroll(view, frames)
+        second = scroll(view, frames)
+        results[name] = second
+
+        line = '{0:<7} first pass {1:>8.1f} fps   second pass {2:>8.1f} fps'.format(name, first, second)
+        if name == 'cached':
+            stats = view.itemDelegate().stats()
+            line += '   hit rate {0:.1%}  ({1} entries, {2} KB)'.format(stats['hitRate'],
+                                                                       stats['entries'],
+                                                                       stats['bytes'] / 1024)
+        print line
+
+    print 'speedup: {0:.2f}x'.format(results['cached'] / results['plain'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Checks that XLogModel keeps up with a sustained stream of log lines.
+
+A producer thread appends lines at the target rate while the Qt event loop
+runs the model's batched flushes.  The benchmark reports the rate lines were
+inserted into the model, the largest backlog left in the queue between
+flushes and the time taken to apply a word filter over the full buffer.
+
+Qt 4 has no offscreen platform, so by default only the model is driven from a
+non-GUI application.  Pass --view to attach and paint an XLogView as well,
+which requires a display (or Xvfb).
+
+usage: python benchmarks/xlogview_bench.py [--view] [rate] [seconds]
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xqt import QtCore, QtGui
+from xqt.gui.xlogview import XLogModel, XLogView
+
+LEVELS = (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR)
+
+
+def produce(model, rate, seconds, done):
+    """ Appends lines at the inputed rate, in small bursts every millisecond """
+    start = time.time()
+    sent = 0
+    total = int(rate * seconds)
+    while sent < total:
+        target = min(total, int((time.time() - start) * rate))
+        while sent < target:
+            model.append('worker {0} processed item {1} in {2} ms'.format(sent % 16, sent, sent % 97),
+                         LEVELS[sent % 4])
+            sent += 1
+        time.sleep(0.001)
+    done.set()
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != '--view']
+    with_view = '--view' in sys.argv
+    rate = int(args[0]) if args else 100000
+    seconds = float(args[1]) if len(args) > 1 else 5.0
+
+    if with_view:
+        app = QtGui.QApplication([])
+        view = XLogView()
+        view.resize(800, 600)
+        view.show()
+        model = view.model()
+    else:
+        app = QtCore.QCoreApplication([])
+        model = XLogModel()
+
+    inserted = [0]
+    model.rowsInserted.connect(lambda parent, first, last: inserted.__setitem__(0, inserted[0] + last - first + 1))
+
+    backlog = [0]
+    def sample():
+        backlog[0] = max(backlog[0], len(model._queue))
+    sampler = QtCore.QTimer()
+    sampler.timeout.connect(sample)
+    sampler.start(5)
+
+    done = threading.Event()
+    producer = threading.Thread(target=produce, args=(model, rate, seconds, done))
+    producer.daemon = True
+
+    start = time.time()
+    producer.start()
+    while not done.is_set() or len(model._queue):
+        app.processEvents(QtCore.QEventLoop.AllEvents, 5)
+    elapsed = time.time() - start
+
+    achieved = inserted[0] / elapsed
+    print 'target rate   : {0:>10} lines/s'.format(rate)
+    print 'inserted rate : {0:>10.0f} lines/s'.format(achieved)
+    print 'max backlog   : {0:>10} lines'.format(backlog[0])
+    print 'rows kept     : {0:>10} (capacity {1})'.format(model.rowCount(), model.capacity())
+
+    start = time.time()
+    model.setFilter('item 12345')
+    print 'filter        : {0:>10.2f} ms ({1} matches)'.format((time.time() - start) * 1000,
+                                                             model.rowCount())
+    model.setFilter('')
+
+    if achieved < rate * 0.95:
+        print 'FAILED: model did not keep up with the target rate'
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
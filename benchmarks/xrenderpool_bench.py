@@ -0,0 +1,73 @@
+"""
+Measures XRenderPool throughput for an increasing number of worker processes,
+compared against rendering on a single thread in the host.
+
+usage: python benchmarks/xrenderpool_bench.py [jobs] [size]
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xqt import QtCore, QtGui
+from xqt.gui.xrenderpool import XRenderJob, XRenderPool
+
+
+def drawThumb(painter, rect, seed=0):
+    """ Draws a deliberately busy thumbnail so rendering dominates """
+    painter.setRenderHint(QtGui.QPainter.Antialiasing)
+    painter.fillRect(rect, QtGui.QColor(240, 240, 240))
+    for i in range(200):
+        color = QtGui.QColor.fromHsv((seed * 7 + i * 13) % 360, 200, 200)
+        painter.setPen(color)
+        painter.drawEllipse(QtCore.QRectF((i * 17 + seed) % rect.width(),
+                                          (i * 29 + seed) % rect.height(),
+                                          24, 24))
+    painter.setPen(QtGui.QColor('black'))
+    painter.drawText(rect, QtCore.Qt.AlignCenter, 'thumb {0}'.format(seed))
+
+def renderLocal(jobs):
+    for job in jobs:
+        width, height = job.size
+        image = QtGui.QImage(width, height, QtGui.QImage.Format_ARGB32_Premultiplied)
+        painter = QtGui.QPainter(image)
+        drawThumb(painter, QtCore.QRect(0, 0, width, height), **job.options)
+        painter.end()
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 128
+
+    jobs = [XRenderJob('xrenderpool_bench.drawThumb', (size, size), seed=i)
+            for i in range(count)]
+
+    counts = sorted(set([1, 2, 4, multiprocessing.cpu_count()]))
+    counts = [n for n in counts if n <= multiprocessing.cpu_count()]
+
+    app = QtGui.QApplication([], False)
+
+    start = time.time()
+    renderLocal(jobs)
+    baseline = count / (time.time() - start)
+    print 'host thread : {0:>10.1f} images/s'.format(baseline)
+
+    for processes in counts:
+        with XRenderPool(processes) as pool:
+            # warm up the workers so imports are not measured
+            pool.renderAll(jobs[:processes * 2])
+
+            start = time.time()
+            images = pool.renderAll(jobs)
+            rate = count / (time.time() - start)
+
+        failed = sum(1 for image in images if image.isNull())
+        print '{0:>2} workers  : {1:>10.1f} images/s  {2:>5.2f}x  ({3} failed)'.format(processes,
+                                                                                  rate,
+                                                                                  rate / baseline,
+                                                                                  failed)
+
+if __name__ == '__main__':
+    main()
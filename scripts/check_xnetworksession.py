@@ -0,0 +1,132 @@
+"""
+Exercises XNetworkSession against a local HTTP server, checking that
+identical GETs are merged, that the per-host limit is respected and that
+cached responses are revalidated with the server.
+
+usage: python scripts/check_xnetworksession.py
+"""
+
+import BaseHTTPServer
+import SocketServer
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xqt import QtCore
+from xqt.network.xnetworksession import XNetworkSession
+
+ETAG = '"v1"'
+
+
+class Stats(object):
+    lock = threading.Lock()
+    hits = {}
+    active = 0
+    maxActive = 0
+    revalidated = 0
+
+#----------------------------------------------------------------------
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with Stats.lock:
+            Stats.hits[self.path] = Stats.hits.get(self.path, 0) + 1
+            Stats.active += 1
+            Stats.maxActive = max(Stats.maxActive, Stats.active)
+
+        try:
+            if self.path.startswith('/slow/'):
+                time.sleep(0.3)
+                self.reply(200, self.path)
+
+            elif self.path == '/etag':
+                if self.headers.get('If-None-Match') == ETAG:
+                    with Stats.lock:
+                        Stats.revalidated += 1
+                    self.reply(304, '')
+                else:
+                    self.reply(200, 'cached body')
+            else:
+                self.reply(404, '')
+        finally:
+            with Stats.lock:
+                Stats.active -= 1
+
+    def reply(self, status, body):
+        self.send_response(status)
+        self.send_header('ETag', ETAG)
+        self.send_header('Cache-Control', 'max-age=0, must-revalidate')
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+class Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+#----------------------------------------------------------------------
+
+def wait(app, replies, timeout=10):
+    end = time.time() + timeout
+    while not all(reply.isFinished() for reply in replies):
+        if time.time() > end:
+            raise AssertionError('timed out waiting for replies')
+        app.processEvents(QtCore.QEventLoop.AllEvents, 50)
+
+def main():
+    app = QtCore.QCoreApplication([])
+
+    server = Server(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    base = 'http://127.0.0.1:{0}'.format(server.server_address[1])
+
+    cache_dir = tempfile.mkdtemp()
+    session = XNetworkSession.instance()
+    session.setCacheDirectory(cache_dir)
+
+    try:
+        # identical in-flight GETs share a single request
+        replies = [session.get(base + '/slow/shared') for i in range(5)]
+        wait(app, replies)
+        assert all(reply is replies[0] for reply in replies), 'replies were not merged'
+        assert Stats.hits['/slow/shared'] == 1, Stats.hits
+        assert replies[0].data() == '/slow/shared'
+        print 'ok: de-duplicated identical GETs'
+
+        # no more than the per-host limit are active at once
+        Stats.maxActive = 0
+        session.setMaxConnectionsPerHost(2)
+        replies = [session.get(base + '/slow/{0}'.format(i)) for i in range(6)]
+        wait(app, replies)
+        assert Stats.maxActive == 2, Stats.maxActive
+        print 'ok: per-host limit of 2 respected'
+
+        # stale cache entries are revalidated and served from the cache
+        first = session.get(base + '/etag')
+        wait(app, [first])
+        second = session.get(base + '/etag')
+        wait(app, [second])
+        assert Stats.revalidated == 1, Stats.revalidated
+        assert second.isFromCache(), 'revalidated reply was not served from the cache'
+        assert second.data() == 'cached body', second.data()
+        print 'ok: cached response revalidated with a 304'
+
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
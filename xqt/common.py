@@ -8,6 +8,9 @@ def py2q(py_object):
 def q2py(q_variant, default=None):
     return q_variant
 
+def isDeleted(q_object):
+    return False
+
 # backwards compat
 def wrapNone(value):
     if value is None:
@@ -0,0 +1,315 @@
+"""
+Defines the XObjectCensus class for tracking the Qt objects created by the
+ui loaders in long running sessions.
+
+Every object built while loading a form is registered by weak reference along
+with its class and originating .ui file, so a snapshot only walks the tracked
+objects rather than the entire garbage collector.  Snapshots can be diffed to
+see which forms are growing, and the leak report lists the Python references
+keeping wrappers alive after their C++ objects have been deleted, such as the
+attributes the loaders set on the base instance.
+
+The census can be enabled by setting the XQT_OBJECT_CENSUS environment
+variable to a sampling interval in seconds, or from code:
+
+:usage      |from xqt import diagnostics
+            |census = diagnostics.enable(interval=300)
+            |...
+            |print census.snapshots()[-1].diff(census.snapshots()[0])
+            |for leak in census.leaks():
+            |    print leak
+"""
+
+# define authorship information
+__authors__         = ['Eric Hulser']
+__author__          = ','.join(__authors__)
+__credits__         = []
+__copyright__       = 'Copyright (c) 2012, Projex Software'
+__license__         = 'LGPL'
+
+# maintenance information
+__maintainer__      = 'Projex Software'
+__email__           = 'team@projexsoftware.com'
+
+import collections
+import gc
+import logging
+import os
+import sys
+import time
+import types
+import weakref
+
+log = logging.getLogger(__name__)
+
+_census = None
+
+DEFAULT_INTERVAL = 60
+DEFAULT_HISTORY = 60
+
+
+class XCensusSnapshot(object):
+    """ Counts of the tracked objects at a point in time """
+    def __init__(self, byClass, byFile, deleted):
+        self.time = time.time()
+        self.byClass = byClass
+        self.byFile = byFile
+        self.deleted = deleted
+
+    def __repr__(self):
+        return '<XCensusSnapshot {0} objects, {1} deleted>'.format(sum(self.byClass.values()),
+                                                                  sum(self.deleted.values()))
+
+    def diff(self, other):
+        """
+        Returns the change in counts from the inputed older snapshot to this
+        one, omitting anything that did not change.
+
+        :param      other | <XCensusSnapshot>
+
+        :return     {<str> group: {<str> key: <int> delta, ..}, ..}
+        """
+        output = {}
+        for group in ('byClass', 'byFile', 'deleted'):
+            mine = getattr(self, group)
+            theirs = getattr(other, group)
+            delta = {}
+            for key in set(mine) | set(theirs):
+                change = mine.get(key, 0) - theirs.get(key, 0)
+                if change:
+                    delta[key] = change
+            output[group] = delta
+        return output
+
+#----------------------------------------------------------------------
+
+class XObjectCensus(object):
+    def __init__(self, interval=None, history=DEFAULT_HISTORY):
+        self._interval = interval
+        self._tracked = {}
+        self._snapshots = collections.deque(maxlen=history)
+        self._timer = None
+
+    def _describeReferrer(self, referrer, target):
+        """
+        Returns a readable description of how the inputed referrer holds onto
+        the target object.
+
+        :param      referrer | <variant>
+                    target | <variant>
+
+        :return     <str>
+        """
+        if isinstance(referrer, dict):
+            keys = [key for key, value in referrer.items() if value is target]
+
+            # resolve instance dictionaries back to their owner
+            for owner in gc.get_referrers(referrer):
+                if getattr(owner, '__dict__', None) is referrer:
+                    return '{0}.{1}'.format(type(owner).__name__, ', '.join(map(str, keys)))
+            return 'dict[{0}]'.format(', '.join(map(repr, keys)))
+
+        elif isinstance(referrer, (list, tuple, set)):
+            return '{0} of {1} items'.format(type(referrer).__name__, len(referrer))
+
+        elif isinstance(referrer, types.FrameType):
+            return 'frame {0}:{1}'.format(referrer.f_code.co_filename, referrer.f_lineno)
+
+        return type(referrer).__name__
+
+    def _untrack(self, key):
+        self._tracked.pop(key, None)
+
+    def leaks(self):
+        """
+        Returns the tracked objects whose C++ instance has been deleted while
+        the Python wrapper is still referenced, along with what is holding
+        them.
+
+        :return     [(<str> class, <str> name, <str> filename, [<str> referrer, ..]), ..]
+        """
+        from xqt import isDeleted
+
+        output = []
+        ignore = set([id(self._tracked), id(sys._getframe())])
+
+        for ref, clsname, name, filename in self._tracked.values():
+            obj = ref()
+            if obj is None or not isDeleted(obj):
+                continue
+
+            referrers = []
+            for referrer in gc.get_referrers(obj):
+                if id(referrer) in ignore or isinstance(referrer, weakref.ref):
+                    continue
+                referrers.append(self._describeReferrer(referrer, obj))
+
+            output.append((clsname, name, filename, referrers))
+            del obj
+
+        return output
+
+    def interval(self):
+        """
+        Returns the number of seconds between periodic snapshots.
+
+        :return     <int> || <float> || None
+        """
+        return self._interval
+
+    def snapshot(self):
+        """
+        Counts the tracked objects that are still alive by class and by
+        originating file, storing the result in the history.
+
+        :return     <XCensusSnapshot>
+        """
+        from xqt import isDeleted
+
+        by_class = collections.defaultdict(int)
+        by_file = collections.defaultdict(int)
+        deleted = collections.defaultdict(int)
+
+        for ref, clsname, name, filename in self._tracked.values():
+            obj = ref()
+            if obj is None:
+                continue
+            elif isDeleted(obj):
+                deleted[filename] += 1
+            else:
+                by_class[clsname] += 1
+                by_file[filename] += 1
+
+        snapshot = XCensusSnapshot(dict(by_class), dict(by_file), dict(deleted))
+        if self._snapshots:
+            changes = snapshot.diff(self._snapshots[-1])
+            if changes['byFile'] or changes['deleted']:
+                log.debug('object census changes: %s', changes)
+
+        self._snapshots.append(snapshot)
+        return snapshot
+
+    def snapshots(self):
+        """
+        Returns the history of snapshots, oldest first.
+
+        :return     [<XCensusSnapshot>, ..]
+        """
+        return list(self._snapshots)
+
+    def start(self, interval=None):
+        """
+        Starts taking a snapshot every interval seconds from the Qt event
+        loop.
+
+        :param      interval | <int> || <float> || None
+        """
+        from xqt import QtCore
+
+        if interval is not None:
+            self._interval = interval
+        interval = self._interval or DEFAULT_INTERVAL
+
+        if self._timer is None:
+            self._timer = QtCore.QTimer()
+            self._timer.timeout.connect(self.snapshot)
+        self._timer.start(int(interval * 1000))
+
+    def stop(self):
+        """
+        Stops taking periodic snapshots.
+        """
+        if self._timer is not None:
+            self._timer.stop()
+
+    def track(self, obj, filename=''):
+        """
+        Registers the inputed object and all of its children as originating
+        from the given file.
+
+        :param      obj | <QtCore.QObject>
+                    filename | <str>
+        """
+        from xqt import QtCore
+
+        # the timer is started lazily so the census can be enabled before
+        # the Qt application exists
+        if self._timer is None and self._interval:
+            self.start()
+
+        for item in [obj] + list(obj.findChildren(QtCore.QObject)):
+            key = id(item)
+            if key in self._tracked:
+                continue
+
+            try:
+                ref = weakref.ref(item, lambda r, key=key: self._untrack(key))
+            except TypeError:
+                continue
+
+            self._tracked[key] = (ref, type(item).__name__, item.objectName(), filename)
+
+    def trackedCount(self):
+        """
+        Returns the number of objects currently being tracked.
+
+        :return     <int>
+        """
+        return len(self._tracked)
+
+#----------------------------------------------------------------------
+
+def census():
+    """
+    Returns the active object census, if enabled.
+
+    :return     <XObjectCensus> || None
+    """
+    return _census
+
+def disable():
+    """
+    Stops tracking objects created by the loaders.
+    """
+    global _census
+    if _census is not None:
+        _census.stop()
+    _census = None
+
+def enable(interval=DEFAULT_INTERVAL, history=DEFAULT_HISTORY):
+    """
+    Starts tracking objects created by the loaders, taking a snapshot every
+    interval seconds once the first form has been loaded.  Pass an interval
+    of None to only take snapshots manually.
+
+    :param      interval | <int> || <float> || None
+                history | <int>
+
+    :return     <XObjectCensus>
+    """
+    global _census
+    if _census is None:
+        _census = XObjectCensus(interval, history)
+    elif interval:
+        # restart a running timer, otherwise wait for the first form
+        if _census._timer is not None:
+            _census.start(interval)
+        else:
+            _census._interval = interval
+    return _census
+
+def track(obj, filename=''):
+    """
+    Registers the inputed object with the active census, if enabled.
+
+    :param      obj | <QtCore.QObject>
+                filename | <str>
+    """
+    if _census is not None and obj is not None:
+        _census.track(obj, filename)
+
+# enable from the environment
+_env = os.environ.get('XQT_OBJECT_CENSUS')
+if _env:
+    enable(float(_env) if _env != '1' else DEFAULT_INTERVAL)
+
@@ -0,0 +1,418 @@
+"""
+Defines the XCachedItemDelegate class, which caches the rendered pixmap for
+each cell so unchanged cells are blitted instead of repainted while
+scrolling.
+
+Subclasses implement paintCell instead of paint.  The rendered pixmap is keyed
+on a fingerprint of the cell's data along with its size, state and style, and
+stored in a byte bounded LRU.  The entries for a cell are also dropped when
+its model emits dataChanged for it.
+
+paintCell must only draw from the data covered by fingerprint, since any
+cell with an equal fingerprint is blitted from the same pixmap.  Subclasses
+that draw from the row, other roles or external state must extend
+fingerprint to include it.
+
+:usage      |class ThumbnailDelegate(XCachedItemDelegate):
+            |    def paintCell(self, painter, option, index):
+            |        ... expensive drawing ...
+            |
+            |view.setItemDelegate(ThumbnailDelegate(view))
+"""
+
+# define authorship information
+__authors__         = ['Eric Hulser']
+__author__          = ','.join(__authors__)
+__credits__         = []
+__copyright__       = 'Copyright (c) 2012, Projex Software'
+__license__         = 'LGPL'
+
+# maintenance information
+__maintainer__      = 'Projex Software'
+__email__           = 'team@projexsoftware.com'
+
+import datetime
+import decimal
+
+from xqt import QtCore, QtGui, QT_WRAPPER, q2py
+from xqt.gui.ximagecache import XByteLRU
+
+DEFAULT_CACHE_LIMIT = 32 * 1024 * 1024
+
+FINGERPRINT_ROLES = (QtCore.Qt.DisplayRole,
+                     QtCore.Qt.DecorationRole,
+                     QtCore.Qt.FontRole,
+                     QtCore.Qt.TextAlignmentRole,
+                     QtCore.Qt.BackgroundRole,
+                     QtCore.Qt.ForegroundRole,
+                     QtCore.Qt.CheckStateRole)
+
+# python types that hash and compare by value
+VALUE_TYPES = (basestring,
+               int,
+               long,
+               float,
+               bool,
+               datetime.date,
+               datetime.time,
+               datetime.timedelta,
+               decimal.Decimal)
+
+
+class Uncacheable(Exception):
+    """ Raised when a data value cannot be converted to a stable key """
+    pass
+
+
+def isQtEnum(value):
+    """
+    Returns whether or not the inputed value is an enum or flags value from
+    the active Qt wrapper.
+
+    :param      value | <variant>
+
+    :return     <bool>
+    """
+    cls = type(value)
+    module = getattr(cls, '__module__', None) or ''
+    return (module.split('.')[0] == QT_WRAPPER and
+            hasattr(cls, '__int__') and
+            hasattr(cls, '__or__'))
+
+def pointKey(point):
+    return (point.x(), point.y())
+
+def brushKey(brush):
+    """
+    Returns a hashable key for the inputed brush, including its gradient or
+    texture so brushes sharing a base color are kept apart.
+
+    :param      brush | <QtGui.QBrush>
+
+    :return     <tuple>
+    """
+    transform = brush.transform()
+    key = ['QBrush',
+           int(brush.style()),
+           brush.color().rgba(),
+           (transform.m11(), transform.m12(), transform.m21(),
+            transform.m22(), transform.dx(), transform.dy())]
+
+    gradient = brush.gradient()
+    if gradient is not None:
+        key.append(int(gradient.type()))
+        key.append(int(gradient.spread()))
+        key.append(int(gradient.coordinateMode()))
+        key.append(tuple((position, color.rgba()) for position, color in gradient.stops()))
+
+        if isinstance(gradient, QtGui.QLinearGradient):
+            key.append((pointKey(gradient.start()), pointKey(gradient.finalStop())))
+        elif isinstance(gradient, QtGui.QRadialGradient):
+            key.append((pointKey(gradient.center()),
+                        gradient.radius(),
+                        pointKey(gradient.focalPoint())))
+        elif isinstance(gradient, QtGui.QConicalGradient):
+            key.append((pointKey(gradient.center()), gradient.angle()))
+
+    elif brush.style() == QtCore.Qt.TexturePattern:
+        key.append(brush.textureImage().cacheKey())
+
+    return tuple(key)
+
+def valueKey(value):
+    """
+    Returns a hashable key for the inputed data value.  Qt value types are
+    converted by content, since their wrappers hash and repr by identity, and
+    Qt enums and flags are converted through int so both wrappers produce the
+    same key.  Any other object raises Uncacheable.
+
+    :param      value | <variant>
+
+    :return     <hashable>
+    """
+    if value is None or isinstance(value, VALUE_TYPES):
+        return value
+    elif isinstance(value, (QtGui.QIcon, QtGui.QPixmap, QtGui.QImage)):
+        return (type(value).__name__, value.cacheKey())
+    elif isinstance(value, QtGui.QColor):
+        return ('QColor', value.rgba())
+    elif isinstance(value, QtGui.QBrush):
+        return brushKey(value)
+    elif isinstance(value, QtGui.QFont):
+        return ('QFont', value.toString())
+    elif isinstance(value, (list, tuple)):
+        return tuple(valueKey(item) for item in value)
+    elif isQtEnum(value):
+        return int(value)
+    raise Uncacheable(type(value).__name__)
+
+#----------------------------------------------------------------------
+
+class XCachedItemDelegate(QtGui.QStyledItemDelegate):
+    def __init__(self, parent=None, cacheLimit=DEFAULT_CACHE_LIMIT):
+        super(XCachedItemDelegate, self).__init__(parent)
+
+        # define custom properties
+        self._cache = XByteLRU(cacheLimit, evicted=self._evicted)
+        self._models = set()
+
+        # cells are only mapped while their pixmap is cached, so the maps
+        # stay bounded by the cache rather than the cells ever painted
+        self._cellKeys = {}
+        self._keyCells = {}
+
+    def _cellId(self, index):
+        """
+        Returns the key identifying the inputed cell within its model.
+
+        :param      index | <QtCore.QModelIndex>
+
+        :return     <tuple>
+        """
+        parent = index.parent()
+        return (index.row(), index.column(), parent.row(), parent.column(), parent.internalId())
+
+    def _evicted(self, key, pixmap):
+        """
+        Drops the cells mapped to the inputed key once the cache has evicted
+        its pixmap.
+
+        :param      key | <tuple>
+                    pixmap | <QtGui.QPixmap>
+        """
+        for model_id, cell in self._keyCells.pop(key, ()):
+            cells = self._cellKeys.get(model_id)
+            if cells is not None and cells.get(cell) == key:
+                del cells[cell]
+                if not cells:
+                    del self._cellKeys[model_id]
+
+    def _forgetModel(self, modelId, release=False):
+        """
+        Drops the cell mapping for the inputed model.  Pixmaps stay cached
+        since their keys are based on content rather than position.
+
+        :param      modelId | <int>
+                    release | <bool> | stop watching the model as well
+        """
+        cells = self._cellKeys.pop(modelId, None)
+        if cells:
+            for cell, key in cells.iteritems():
+                self._unmapCell(modelId, cell, key)
+
+        if release:
+            self._models.discard(modelId)
+
+    def _invalidateRange(self, modelId, topLeft, bottomRight):
+        """
+        Discards the cached pixmaps for the inputed range of cells.
+
+        :param      modelId | <int>
+                    topLeft | <QtCore.QModelIndex>
+                    bottomRight | <QtCore.QModelIndex>
+        """
+        cells = self._cellKeys.get(modelId)
+        if not cells:
+            return
+
+        parent = topLeft.parent()
+        for row in xrange(topLeft.row(), bottomRight.row() + 1):
+            for column in xrange(topLeft.column(), bottomRight.column() + 1):
+                cell = (row, column, parent.row(), parent.column(), parent.internalId())
+                key = cells.get(cell)
+                if key is not None:
+                    # every cell sharing the pixmap loses it as well
+                    self._cache.discard(key)
+                    self._evicted(key, None)
+
+    def _mapCell(self, modelId, cell, key):
+        """
+        Records that the inputed cell was painted from the cached key.
+
+        :param      modelId | <int>
+                    cell | <tuple>
+                    key | <tuple>
+        """
+        cells = self._cellKeys.setdefault(modelId, {})
+        old_key = cells.get(cell)
+        if old_key == key:
+            return
+        elif old_key is not None:
+            self._unmapCell(modelId, cell, old_key)
+
+        cells[cell] = key
+        self._keyCells.setdefault(key, set()).add((modelId, cell))
+
+    def _unmapCell(self, modelId, cell, key):
+        """
+        Removes the inputed cell from the reverse mapping for the given key.
+
+        :param      modelId | <int>
+                    cell | <tuple>
+                    key | <tuple>
+        """
+        owners = self._keyCells.get(key)
+        if owners is not None:
+            owners.discard((modelId, cell))
+            if not owners:
+                del self._keyCells[key]
+
+    def _watchModel(self, model):
+        """
+        Connects to the inputed model so cached cells are invalidated as its
+        data changes.
+
+        :param      model | <QtCore.QAbstractItemModel>
+        """
+        model_id = id(model)
+        if model_id in self._models:
+            return
+
+        forget = lambda *args: self._forgetModel(model_id)
+
+        model.dataChanged.connect(lambda tl, br, *args: self._invalidateRange(model_id, tl, br))
+        model.modelReset.connect(forget)
+        model.layoutChanged.connect(forget)
+        model.rowsInserted.connect(forget)
+        model.rowsRemoved.connect(forget)
+        model.columnsInserted.connect(forget)
+        model.columnsRemoved.connect(forget)
+        model.destroyed.connect(lambda *args: self._forgetModel(model_id, release=True))
+
+        self._models.add(model_id)
+
+    def cacheKey(self, option, index):
+        """
+        Returns the key used to cache the rendered pixmap for the inputed
+        cell, or None if the cell should not be cached.
+
+        :param      option | <QtGui.QStyleOptionViewItem>
+                    index | <QtCore.QModelIndex>
+
+        :return     <tuple> || None
+        """
+        widget = self.parent() if isinstance(self.parent(), QtGui.QWidget) else None
+        style = widget.style() if widget is not None else QtGui.QApplication.style()
+
+        fingerprint = self.fingerprint(index)
+        if fingerprint is None:
+            return None
+
+        return (fingerprint,
+                option.rect.width(),
+                option.rect.height(),
+                int(option.state),
+                option.palette.cacheKey(),
+                option.font.toString(),
+                style.objectName())
+
+    def cacheLimit(self):
+        """
+        Returns the maximum number of bytes of pixmaps to cache.
+
+        :return     <int>
+        """
+        return self._cache.limit()
+
+    def clearCache(self):
+        """
+        Removes all of the cached pixmaps.
+        """
+        self._cache.clear()
+        self._cellKeys.clear()
+        self._keyCells.clear()
+
+    def fingerprint(self, index):
+        """
+        Returns a hashable summary of the data used to draw the inputed
+        cell, or None if the data cannot be keyed reliably.  This must cover
+        everything paintCell reads, since cells with equal fingerprints share
+        a pixmap.  Subclasses that draw from other roles, the row or column,
+        or custom objects must extend this.
+
+        :param      index | <QtCore.QModelIndex>
+
+        :return     <tuple> || None
+        """
+        try:
+            return tuple(valueKey(q2py(index.data(role))) for role in FINGERPRINT_ROLES)
+        except Uncacheable:
+            return None
+
+    def paint(self, painter, option, index):
+        """
+        Blits the cached pixmap for the inputed cell, rendering it through
+        paintCell first if it is not cached.
+
+        :param      painter | <QtGui.QPainter>
+                    option | <QtGui.QStyleOptionViewItem>
+                    index | <QtCore.QModelIndex>
+        """
+        rect = option.rect
+        key = self.cacheKey(option, index)
+        if key is None or rect.isEmpty():
+            self.paintCell(painter, option, index)
+            return
+
+        pixmap = self._cache.get(key)
+        if pixmap is None:
+            pixmap = QtGui.QPixmap(rect.size())
+            pixmap.fill(QtCore.Qt.transparent)
+
+            cell_option = QtGui.QStyleOptionViewItemV4(option)
+            cell_option.rect = QtCore.QRect(QtCore.QPoint(0, 0), rect.size())
+
+            cell_painter = QtGui.QPainter(pixmap)
+            try:
+                self.paintCell(cell_painter, cell_option, index)
+            finally:
+                cell_painter.end()
+
+            self._cache.set(key, pixmap, rect.width() * rect.height() * 4)
+
+        # pixmaps larger than the whole cache are never stored
+        if key in self._cache:
+            model = index.model()
+            self._watchModel(model)
+            self._mapCell(id(model), self._cellId(index), key)
+
+        painter.drawPixmap(rect.topLeft(), pixmap)
+
+    def paintCell(self, painter, option, index):
+        """
+        Renders the inputed cell.  Subclasses should override this method
+        rather than paint.  The option rect is relative to the cached pixmap.
+        Only draw from data covered by fingerprint, as the result is reused
+        for every cell with the same fingerprint.
+
+        :param      painter | <QtGui.QPainter>
+                    option | <QtGui.QStyleOptionViewItem>
+                    index | <QtCore.QModelIndex>
+        """
+        super(XCachedItemDelegate, self).paint(painter, option, index)
+
+    def setCacheLimit(self, limit):
+        """
+        Sets the maximum number of bytes of pixmaps to cache.
+
+        :param      limit | <int>
+        """
+        self._cache.setLimit(limit)
+
+    def stats(self):
+        """
+        Returns the hit statistics for the pixmap cache.
+
+        :return     {<str> key: <variant> value, ..}
+        """
+        hits = self._cache.hits()
+        misses = self._cache.misses()
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'bytes': self._cache.total(),
+            'entries': len(self._cache),
+            'hitRate': hits / float(total) if total else 0.0
+        }
+
@@ -0,0 +1,596 @@
+"""
+Defines the XImageCache class, a two tier cache for icons and pixmaps.
+
+The first tier is an in-memory LRU bounded by the number of bytes of pixel
+data it holds.  The second tier stores pre-rasterized images on disk for
+each requested size and device pixel ratio, keyed by a hash of the source
+file contents, so that a cold start memory-maps the pixels instead of
+decoding the PNG or SVG again.  The disk tier is pruned of its least recently
+used files once it grows past its byte limit.
+
+Memory hits are keyed by path and only re-check the source file once every
+check interval, so a paint loop does not pay for a stat per call.
+
+:usage      |cache = XImageCache(directory=os.path.expanduser('~/.cache/mytool/icons'))
+            |button.setIcon(QtGui.QIcon(cache.pixmap('icons/save.svg', (16, 16))))
+            |print cache.stats()
+"""
+
+# define authorship information
+__authors__         = ['Eric Hulser']
+__author__          = ','.join(__authors__)
+__credits__         = []
+__copyright__       = 'Copyright (c) 2012, Projex Software'
+__license__         = 'LGPL'
+
+# maintenance information
+__maintainer__      = 'Projex Software'
+__email__           = 'team@projexsoftware.com'
+
+import collections
+import ctypes
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+from xqt import QtCore, QtGui
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+DEFAULT_DISK_LIMIT = 256 * 1024 * 1024
+
+# seconds before a source file is checked for changes again
+DEFAULT_CHECK_INTERVAL = 2.0
+
+DISK_SUFFIX = '.xqi'
+
+# magic, width, height, bytes per line, device pixel ratio * 100
+HEADER = struct.Struct('<4sIIII')
+HEADER_MAGIC = 'XQI1'
+
+
+class XByteLRU(object):
+    """
+    Least recently used mapping that evicts entries once the total cost of
+    its values exceeds the byte limit.  The optional evicted callback is
+    called with the key and value of each entry dropped to make room.
+    """
+    def __init__(self, limit, evicted=None):
+        self._limit = limit
+        self._evicted = evicted
+        self._total = 0
+        self._entries = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _trim(self):
+        """
+        Evicts the least recently used entries until the total cost fits
+        within the limit.
+        """
+        while self._total > self._limit:
+            old_key, (old_value, old_cost) = self._entries.popitem(last=False)
+            self._total -= old_cost
+            if self._evicted is not None:
+                self._evicted(old_key, old_value)
+
+    def clear(self):
+        """
+        Removes all of the entries from this cache.
+        """
+        self._entries.clear()
+        self._total = 0
+
+    def discard(self, key):
+        """
+        Removes the inputed key from this cache if it exists.
+
+        :param      key | <hashable>
+        """
+        try:
+            value, cost = self._entries.pop(key)
+        except KeyError:
+            pass
+        else:
+            self._total -= cost
+
+    def get(self, key, default=None):
+        """
+        Returns the value for the inputed key, marking it as most recently
+        used.
+
+        :param      key | <hashable>
+                    default | <variant>
+
+        :return     <variant>
+        """
+        try:
+            entry = self._entries.pop(key)
+        except KeyError:
+            self._misses += 1
+            return default
+
+        self._entries[key] = entry
+        self._hits += 1
+        return entry[0]
+
+    def hits(self):
+        return self._hits
+
+    def limit(self):
+        return self._limit
+
+    def misses(self):
+        return self._misses
+
+    def set(self, key, value, cost):
+        """
+        Stores the inputed value, evicting the least recently used entries
+        until the total cost fits within the limit.  Values larger than the
+        limit are not stored.
+
+        :param      key | <hashable>
+                    value | <variant>
+                    cost | <int> bytes
+        """
+        self.discard(key)
+        if cost > self._limit:
+            return
+
+        self._entries[key] = (value, cost)
+        self._total += cost
+        self._trim()
+
+    def setLimit(self, limit):
+        """
+        Sets the byte limit for this cache, evicting entries as needed.
+
+        :param      limit | <int>
+        """
+        self._limit = limit
+        self._trim()
+
+    def total(self):
+        return self._total
+
+#----------------------------------------------------------------------
+
+class XImageCache(object):
+    def __init__(self,
+                 directory=None,
+                 memoryLimit=DEFAULT_MEMORY_LIMIT,
+                 diskLimit=DEFAULT_DISK_LIMIT,
+                 checkInterval=DEFAULT_CHECK_INTERVAL):
+        self._directory = directory
+        self._memory = XByteLRU(memoryLimit)
+        self._diskLimit = diskLimit
+        self._diskBytes = None
+        self._checkInterval = checkInterval
+        self._hashes = {}
+        self._diskHits = 0
+        self._staleHits = 0
+        self._misses = 0
+
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def _decode(self, filename, width, height):
+        """
+        Decodes the source file, rasterizing it at the inputed pixel size.
+
+        :param      filename | <str>
+                    width | <int>
+                    height | <int>
+
+        :return     <QtGui.QImage>
+        """
+        reader = QtGui.QImageReader(filename)
+        reader.setScaledSize(QtCore.QSize(width, height))
+        image = reader.read()
+        if image.isNull():
+            log.error('Could not decode %s: %s', filename, reader.errorString())
+            return image
+        return image.convertToFormat(QtGui.QImage.Format_ARGB32_Premultiplied)
+
+    def _diskPath(self, digest, width, height, ratio):
+        """
+        Returns the disk cache path for the inputed key.
+
+        :return     <str>
+        """
+        filename = '{0}_{1}x{2}@{3}{4}'.format(digest, width, height, int(ratio * 100), DISK_SUFFIX)
+        return os.path.join(self._directory, filename)
+
+    def _diskFiles(self):
+        """
+        Returns the files stored in the disk tier, least recently used first.
+
+        :return     [(<float> mtime, <int> size, <str> path), ..]
+        """
+        output = []
+        try:
+            names = os.listdir(self._directory)
+        except OSError:
+            return output
+
+        for name in names:
+            if not name.endswith(DISK_SUFFIX):
+                continue
+
+            path = os.path.join(self._directory, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            output.append((info.st_mtime, info.st_size, path))
+
+        output.sort()
+        return output
+
+    def _image(self, filename, digest, size, ratio):
+        """
+        Returns the image for the inputed source file and content hash,
+        loading it from the disk tier when possible.
+
+        :param      filename | <str>
+                    digest | <str>
+                    size | (<int> width, <int> height)
+                    ratio | <float>
+
+        :return     <QtGui.QImage>
+        """
+        width = int(round(size[0] * ratio))
+        height = int(round(size[1] * ratio))
+
+        image = None
+        path = None
+        if self._directory and digest:
+            path = self._diskPath(digest, width, height, ratio)
+            image = self._readDisk(path)
+
+        if image is not None:
+            self._diskHits += 1
+
+            # the modification time orders files for pruning
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+        else:
+            self._misses += 1
+            image = self._decode(filename, width, height)
+            if path and not image.isNull():
+                self._writeDisk(path, image, ratio)
+
+        if ratio != 1.0 and hasattr(image, 'setDevicePixelRatio'):
+            image.setDevicePixelRatio(ratio)
+
+        return image
+
+    def _readDisk(self, path):
+        """
+        Memory-maps the inputed cache file and returns the stored image.  The
+        mapped pixels are wrapped in place and copied once into the result.
+
+        :param      path | <str>
+
+        :return     <QtGui.QImage> || None
+        """
+        # a private mapping is writable, which ctypes requires to wrap it,
+        # without ever modifying the file
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (IOError, OSError, ValueError):
+            return None
+
+        try:
+            magic, width, height, bpl, ratio = HEADER.unpack_from(mapped, 0)
+            nbytes = bpl * height
+            if magic != HEADER_MAGIC or len(mapped) < HEADER.size + nbytes:
+                return None
+
+            view = (ctypes.c_char * nbytes).from_buffer(mapped, HEADER.size)
+            image = QtGui.QImage(view,
+                                 width,
+                                 height,
+                                 bpl,
+                                 QtGui.QImage.Format_ARGB32_Premultiplied)
+
+            # the wrapped image is only valid while the file is mapped
+            image = image.copy()
+            del view
+            return image
+        except struct.error:
+            return None
+        finally:
+            mapped.close()
+
+    def _writeDisk(self, path, image, ratio):
+        """
+        Stores the pixels for the inputed image to the disk cache.
+
+        :param      path | <str>
+                    image | <QtGui.QImage>
+                    ratio | <float>
+        """
+        header = HEADER.pack(HEADER_MAGIC,
+                             image.width(),
+                             image.height(),
+                             image.bytesPerLine(),
+                             int(ratio * 100))
+
+        bits = image.constBits()
+        try:
+            data = bits.asstring(image.byteCount())
+        except AttributeError:
+            data = bytes(bits)
+
+        # write to a temp file first so readers never see a partial image
+        temp = None
+        try:
+            handle, temp = tempfile.mkstemp(suffix='.tmp', dir=self._directory)
+            with os.fdopen(handle, 'wb') as f:
+                f.write(header)
+                f.write(data)
+            os.rename(temp, path)
+        except (IOError, OSError):
+            log.exception('Could not write image cache file %s', path)
+            if temp is not None and os.path.exists(temp):
+                os.remove(temp)
+            return
+
+        if self._diskBytes is None:
+            self._diskBytes = sum(size for mtime, size, path in self._diskFiles())
+        else:
+            self._diskBytes += len(header) + len(data)
+
+        if self._diskLimit is not None and self._diskBytes > self._diskLimit:
+            self.pruneDisk()
+
+    def checkInterval(self):
+        """
+        Returns the number of seconds before a source file is checked for
+        changes again.
+
+        :return     <float>
+        """
+        return self._checkInterval
+
+    def clear(self, disk=True):
+        """
+        Clears the in-memory tier of this cache, and the files stored in the
+        disk tier unless disk is False.
+
+        :param      disk | <bool>
+        """
+        self._memory.clear()
+        self._hashes.clear()
+
+        if disk and self._directory:
+            for mtime, size, path in self._diskFiles():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._diskBytes = 0
+
+    def diskLimit(self):
+        """
+        Returns the byte limit for the disk tier.
+
+        :return     <int> || None
+        """
+        return self._diskLimit
+
+    def directory(self):
+        """
+        Returns the directory used for the disk tier.
+
+        :return     <str> || None
+        """
+        return self._directory
+
+    def image(self, filename, size, ratio=1.0):
+        """
+        Returns the image for the inputed source file rasterized at the given
+        logical size and device pixel ratio, loading it from the disk tier
+        when possible.
+
+        :param      filename | <str>
+                    size | (<int> width, <int> height) || <QtCore.QSize>
+                    ratio | <float>
+
+        :return     <QtGui.QImage>
+        """
+        if isinstance(size, QtCore.QSize):
+            size = (size.width(), size.height())
+        return self._image(filename, self.sourceHash(filename), size, ratio)
+
+    def memoryLimit(self):
+        """
+        Returns the byte limit for the in-memory tier.
+
+        :return     <int>
+        """
+        return self._memory.limit()
+
+    def pixmap(self, filename, size, ratio=1.0):
+        """
+        Returns the pixmap for the inputed source file at the given logical
+        size and device pixel ratio.
+
+        :param      filename | <str>
+                    size | (<int> width, <int> height) || <QtCore.QSize>
+                    ratio | <float>
+
+        :return     <QtGui.QPixmap>
+        """
+        if isinstance(size, QtCore.QSize):
+            size = (size.width(), size.height())
+
+        # the digest is only recomputed once the check interval has passed,
+        # so edited files are picked up without a stat on every call
+        digest = self.sourceHash(filename)
+        key = (filename, tuple(size), ratio)
+        if not digest:
+            log.error('Could not read image source %s', filename)
+            self._memory.discard(key)
+            return QtGui.QPixmap()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[1] == digest:
+                return entry[0]
+            self._staleHits += 1
+
+        image = self._image(filename, digest, size, ratio)
+        if image.isNull():
+            self._memory.discard(key)
+            return QtGui.QPixmap()
+
+        pixmap = QtGui.QPixmap.fromImage(image)
+        if ratio != 1.0 and hasattr(pixmap, 'setDevicePixelRatio'):
+            pixmap.setDevicePixelRatio(ratio)
+
+        self._memory.set(key, (pixmap, digest), image.byteCount())
+        return pixmap
+
+    def pruneDisk(self, limit=None):
+        """
+        Removes the least recently used files from the disk tier until it
+        fits within the inputed byte limit, defaulting to the disk limit.
+
+        :param      limit | <int> || None
+        """
+        if not self._directory:
+            return
+
+        if limit is None:
+            limit = self._diskLimit
+            if limit is None:
+                return
+
+        files = self._diskFiles()
+        total = sum(size for mtime, size, path in files)
+        for mtime, size, path in files:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+        self._diskBytes = total
+
+    def setCheckInterval(self, seconds):
+        """
+        Sets the number of seconds before a source file is checked for
+        changes again.  An interval of 0 checks on every call.
+
+        :param      seconds | <float>
+        """
+        self._checkInterval = seconds
+
+    def setDiskLimit(self, limit):
+        """
+        Sets the byte limit for the disk tier, pruning it as needed.  A limit
+        of None disables pruning.
+
+        :param      limit | <int> || None
+        """
+        self._diskLimit = limit
+        if limit is not None:
+            self.pruneDisk()
+
+    def setMemoryLimit(self, limit):
+        """
+        Sets the byte limit for the in-memory tier.
+
+        :param      limit | <int>
+        """
+        self._memory.setLimit(limit)
+
+    def sourceHash(self, filename):
+        """
+        Returns the hash of the contents of the inputed file.  The digest is
+        remembered until the file's modification time or size changes, which
+        is checked at most once per check interval.  Qt resource paths (:/...)
+        are read through QFile and hashed once, since compiled resources
+        cannot change while the process runs.
+
+        :param      filename | <str>
+
+        :return     <str>
+        """
+        now = time.time()
+        cached = self._hashes.get(filename)
+        if cached is not None:
+            cached_stamp, digest, checked = cached
+            if cached_stamp is None or now - checked < self._checkInterval:
+                return digest
+
+        if filename.startswith(':'):
+            f = QtCore.QFile(filename)
+            if not f.open(QtCore.QIODevice.ReadOnly):
+                return ''
+            try:
+                digest = hashlib.sha1(str(f.readAll())).hexdigest()
+            finally:
+                f.close()
+
+            self._hashes[filename] = (None, digest, now)
+            return digest
+
+        try:
+            info = os.stat(filename)
+        except OSError:
+            self._hashes.pop(filename, None)
+            return ''
+
+        stamp = (info.st_mtime, info.st_size)
+        if cached is not None and cached[0] == stamp:
+            self._hashes[filename] = (stamp, cached[1], now)
+            return cached[1]
+
+        try:
+            with open(filename, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+        except IOError:
+            self._hashes.pop(filename, None)
+            return ''
+
+        self._hashes[filename] = (stamp, digest, now)
+        return digest
+
+    def stats(self):
+        """
+        Returns the hit statistics for this cache.
+
+        :return     {<str> key: <variant> value, ..}
+        """
+        # entries found stale by their digest were served as misses
+        memory_hits = self._memory.hits() - self._staleHits
+        total = memory_hits + self._diskHits + self._misses
+        return {
+            'memoryHits': memory_hits,
+            'diskHits': self._diskHits,
+            'misses': self._misses,
+            'memoryBytes': self._memory.total(),
+            'memoryEntries': len(self._memory),
+            'diskBytes': self._diskBytes,
+            'hitRate': (memory_hits + self._diskHits) / float(total) if total else 0.0
+        }
+
@@ -0,0 +1,370 @@
+"""
+Defines the XLazyTreeModel class, which pulls the children of each node on
+demand through the canFetchMore/fetchMore system rather than loading the
+entire hierarchy up front.
+
+Children are provided by a loader callable which accepts the data for a
+parent node (None for the root) and returns any iterable, typically a
+generator.  Only the first chunk of children is pulled when a node is
+expanded, and further chunks are pulled as the view scrolls.
+
+:usage      |def loadAssets(parent):
+            |    path = parent or '/'
+            |    for name in sorted(os.listdir(path)):
+            |        yield os.path.join(path, name)
+            |
+            |model = XLazyTreeModel(loadAssets,
+            |                       display=os.path.basename,
+            |                       hasChildren=os.path.isdir,
+            |                       chunkSize=200)
+            |view.setModel(model)
+"""
+
+# define authorship information
+__authors__         = ['Eric Hulser']
+__author__          = ','.join(__authors__)
+__credits__         = []
+__copyright__       = 'Copyright (c) 2012, Projex Software'
+__license__         = 'LGPL'
+
+# maintenance information
+__maintainer__      = 'Projex Software'
+__email__           = 'team@projexsoftware.com'
+
+import itertools
+import logging
+import Queue
+import threading
+
+from xqt import QtCore
+
+log = logging.getLogger(__name__)
+
+# seconds the fetch thread waits for more work before exiting
+IDLE_TIMEOUT = 5.0
+
+
+class XLazyTreeNode(object):
+    """ Compact node storing the lazy fetching state for a single item """
+    __slots__ = ('data', 'parent', 'row', 'children', 'iterator', 'exhausted', 'fetching')
+
+    def __init__(self, data, parent=None, row=0):
+        self.data = data
+        self.parent = parent
+        self.row = row
+        self.children = []
+        self.iterator = None
+        self.exhausted = False
+        self.fetching = False
+
+#----------------------------------------------------------------------
+
+class XLazyTreeModel(QtCore.QAbstractItemModel):
+    chunkLoaded = QtCore.Signal(object, object, bool)
+
+    def __init__(self,
+                 loader,
+                 display=unicode,
+                 hasChildren=None,
+                 chunkSize=100,
+                 threaded=False,
+                 parent=None):
+        super(XLazyTreeModel, self).__init__(parent)
+
+        # define custom properties
+        self._loader = loader
+        self._display = display
+        self._hasChildren = hasChildren
+        self._chunkSize = chunkSize
+        self._threaded = threaded
+        self._root = XLazyTreeNode(None)
+        self._queue = Queue.Queue()
+        self._worker = None
+        self._workerLock = threading.Lock()
+
+        self.chunkLoaded.connect(self._insertChunk)
+
+    def _fetchChunk(self, node):
+        """
+        Pulls the next chunk of data from the iterator for the inputed node.
+
+        :param      node | <XLazyTreeNode>
+
+        :return     ([<variant>, ..] items, <bool> exhausted)
+        """
+        try:
+            if node.iterator is None:
+                node.iterator = iter(self._loader(node.data))
+            items = list(itertools.islice(node.iterator, self._chunkSize))
+        except Exception:
+            log.exception('Failed to load children for %r', node.data)
+            return [], True
+
+        return items, len(items) < self._chunkSize
+
+    def _fetchThreaded(self, node):
+        """
+        Pulls the next chunk for the inputed node from the fetch thread and
+        hands it back to the model through the chunkLoaded signal.  An empty,
+        exhausted chunk is emitted on failure so the node is never left
+        marked as fetching.
+
+        :param      node | <XLazyTreeNode>
+        """
+        try:
+            items, exhausted = self._fetchChunk(node)
+        except BaseException:
+            log.exception('Failed to load children for %r', node.data)
+            items, exhausted = [], True
+        self.chunkLoaded.emit(node, items, exhausted)
+
+    def _fetchWorker(self):
+        """
+        Main loop for the fetch thread.  Requests are processed one at a time
+        in the order they were made, and the thread exits once it has been
+        idle for IDLE_TIMEOUT seconds.
+        """
+        while True:
+            try:
+                node = self._queue.get(timeout=IDLE_TIMEOUT)
+            except Queue.Empty:
+                # only exit while holding the lock, so a request queued in
+                # the meantime will start a new thread
+                with self._workerLock:
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+                continue
+
+            self._fetchThreaded(node)
+
+    def _insertChunk(self, node, items, exhausted):
+        """
+        Inserts the inputed chunk of items as children of the given node.
+
+        :param      node | <XLazyTreeNode>
+                    items | [<variant>, ..]
+                    exhausted | <bool>
+        """
+        # ignore chunks for nodes that were discarded by a reset
+        root = node
+        while root.parent is not None:
+            root = root.parent
+        if root is not self._root:
+            return
+
+        node.fetching = False
+        node.exhausted = exhausted
+
+        if exhausted:
+            node.iterator = None
+
+        if not items:
+            # the view may have asked for children we did not have
+            if not node.children and node is not self._root:
+                index = self.createIndex(node.row, 0, node)
+                self.dataChanged.emit(index, index)
+            return
+
+        first = len(node.children)
+        last = first + len(items) - 1
+
+        self.beginInsertRows(self._indexFor(node), first, last)
+        node.children.extend(XLazyTreeNode(item, node, first + i)
+                             for i, item in enumerate(items))
+        self.endInsertRows()
+
+    def _indexFor(self, node):
+        """
+        Returns the model index for the inputed node.
+
+        :param      node | <XLazyTreeNode>
+
+        :return     <QtCore.QModelIndex>
+        """
+        if node is self._root:
+            return QtCore.QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def _nodeFor(self, index):
+        """
+        Returns the node for the inputed model index.
+
+        :param      index | <QtCore.QModelIndex>
+
+        :return     <XLazyTreeNode>
+        """
+        if index.isValid():
+            return index.internalPointer()
+        return self._root
+
+    def canFetchMore(self, index):
+        """
+        Returns whether or not there are more children available for the
+        inputed index.
+
+        :param      index | <QtCore.QModelIndex>
+
+        :return     <bool>
+        """
+        node = self._nodeFor(index)
+        return not (node.exhausted or node.fetching)
+
+    def chunkSize(self):
+        """
+        Returns the number of children pulled per fetch.
+
+        :return     <int>
+        """
+        return self._chunkSize
+
+    def columnCount(self, index=QtCore.QModelIndex()):
+        return 1
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        """
+        Returns the data for the inputed index and role.
+
+        :param      index | <QtCore.QModelIndex>
+                    role  | <QtCore.Qt.ItemDataRole>
+
+        :return     <variant>
+        """
+        if not index.isValid():
+            return None
+
+        node = index.internalPointer()
+        if role == QtCore.Qt.DisplayRole:
+            return self._display(node.data)
+        elif role == QtCore.Qt.UserRole:
+            return node.data
+        return None
+
+    def fetchMore(self, index):
+        """
+        Pulls the next chunk of children for the inputed index, either
+        immediately or from the model's background fetch thread.
+
+        :param      index | <QtCore.QModelIndex>
+        """
+        node = self._nodeFor(index)
+        if node.exhausted or node.fetching:
+            return
+
+        node.fetching = True
+        if self._threaded:
+            # a single thread serves every request so expanding a wide tree
+            # does not start a thread per node
+            self._queue.put(node)
+            with self._workerLock:
+                if self._worker is None:
+                    thread = threading.Thread(target=self._fetchWorker)
+                    thread.daemon = True
+                    try:
+                        thread.start()
+                    except Exception:
+                        node.fetching = False
+                        raise
+                    self._worker = thread
+        else:
+            try:
+                items, exhausted = self._fetchChunk(node)
+            finally:
+                node.fetching = False
+            self._insertChunk(node, items, exhausted)
+
+    def hasChildren(self, index=QtCore.QModelIndex()):
+        """
+        Returns whether or not the inputed index has children.  Unfetched
+        nodes report children unless a hasChildren callback says otherwise,
+        so that views will draw an expander without pulling any data.
+
+        :param      index | <QtCore.QModelIndex>
+
+        :return     <bool>
+        """
+        node = self._nodeFor(index)
+        if node.children:
+            return True
+        elif node.exhausted:
+            return False
+        elif self._hasChildren is not None and node is not self._root:
+            return bool(self._hasChildren(node.data))
+        return True
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        """
+        Returns the index for the inputed row and column.
+
+        :param      row | <int>
+                    column | <int>
+                    parent | <QtCore.QModelIndex>
+
+        :return     <QtCore.QModelIndex>
+        """
+        node = self._nodeFor(parent)
+        if 0 <= row < len(node.children) and column == 0:
+            return self.createIndex(row, column, node.children[row])
+        return QtCore.QModelIndex()
+
+    def isThreaded(self):
+        """
+        Returns whether or not children are fetched in a background thread.
+
+        :return     <bool>
+        """
+        return self._threaded
+
+    def parent(self, index):
+        """
+        Returns the parent index for the inputed index.
+
+        :param      index | <QtCore.QModelIndex>
+
+        :return     <QtCore.QModelIndex>
+        """
+        if not index.isValid():
+            return QtCore.QModelIndex()
+
+        node = index.internalPointer().parent
+        if node is None or node is self._root:
+            return QtCore.QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def reset(self):
+        """
+        Clears all loaded nodes so the hierarchy will be fetched again.
+        """
+        self.beginResetModel()
+        self._root = XLazyTreeNode(None)
+        self.endResetModel()
+
+    def rowCount(self, index=QtCore.QModelIndex()):
+        """
+        Returns the number of children that have been fetched for the
+        inputed index.
+
+        :param      index | <QtCore.QModelIndex>
+
+        :return     <int>
+        """
+        if index.column() > 0:
+            return 0
+        return len(self._nodeFor(index).children)
+
+    def setChunkSize(self, chunkSize):
+        """
+        Sets the number of children pulled per fetch.
+
+        :param      chunkSize | <int>
+        """
+        self._chunkSize = chunkSize
+
+    def setThreaded(self, state):
+        """
+        Sets whether or not children are fetched in a background thread.
+
+        :param      state | <bool>
+        """
+        self._threaded = state
+
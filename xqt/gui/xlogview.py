@@ -0,0 +1,441 @@
+"""
+Defines the XLogModel and XLogView classes for displaying high volume log
+output.
+
+Lines may be appended from any thread.  They are collected in a thread-safe
+queue and inserted into the model in a single batch once per frame, and only
+the most recent lines are kept in a fixed size ring buffer.  Each line is
+tokenized as it arrives into an inverted index, so filtering by words or
+level only visits the lines that can match instead of rescanning the text.
+Only the text is kept per line, and each postings list is a packed array of
+sequence numbers, so the index stays small even for unique tokens.
+
+:usage      |view = XLogView()
+            |handler = XLogHandler(view.model())
+            |logging.getLogger().addHandler(handler)
+            |
+            |view.model().setFilter('timeout', minimumLevel=logging.WARNING)
+"""
+
+# define authorship information
+__authors__         = ['Eric Hulser']
+__author__          = ','.join(__authors__)
+__credits__         = []
+__copyright__       = 'Copyright (c) 2012, Projex Software'
+__license__         = 'LGPL'
+
+# maintenance information
+__maintainer__      = 'Projex Software'
+__email__           = 'team@projexsoftware.com'
+
+import array
+import collections
+import heapq
+import logging
+import re
+
+from xqt import QtCore, QtGui
+
+DEFAULT_CAPACITY = 100000
+DEFAULT_INTERVAL = 16
+
+TOKEN_EXPR = re.compile(r'\w+', re.UNICODE)
+
+# evicted postings are dropped from the front of an array in bulk once at
+# least this many have accumulated
+COMPACT_THRESHOLD = 64
+
+
+def tokenize(text):
+    """
+    Returns the set of lowercase words used to index the inputed text.
+
+    :param      text | <str>
+
+    :return     <frozenset>
+    """
+    return frozenset(TOKEN_EXPR.findall(text.lower()))
+
+#----------------------------------------------------------------------
+
+class XLogModel(QtCore.QAbstractListModel):
+    LevelRole = QtCore.Qt.UserRole
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, parent=None):
+        super(XLogModel, self).__init__(parent)
+
+        # define custom properties
+        self._capacity = capacity
+        self._queue = collections.deque()
+
+        # ring buffer of (level, text) keyed by sequence % capacity
+        self._lines = [None] * capacity
+        self._firstSeq = 0
+        self._nextSeq = 0
+
+        # inverted indexes of ascending sequence numbers, along with the
+        # offset of the first live posting for keys with evicted entries
+        self._tokenIndex = {}
+        self._tokenHeads = {}
+        self._levelIndex = {}
+        self._levelHeads = {}
+
+        # filtering options
+        self._filterTokens = frozenset()
+        self._filterLevel = None
+        self._filtered = None
+
+        self._flushTimer = QtCore.QTimer(self)
+        self._flushTimer.setInterval(DEFAULT_INTERVAL)
+        self._flushTimer.timeout.connect(self.flush)
+        self._flushTimer.start()
+
+    def _evict(self, count):
+        """
+        Drops the oldest count lines from the buffer and indexes.
+
+        :param      count | <int>
+        """
+        if not count:
+            return
+
+        lines = self._lines
+        capacity = self._capacity
+        for seq in xrange(self._firstSeq, self._firstSeq + count):
+            slot = seq % capacity
+            level, text = lines[slot]
+            lines[slot] = None
+
+            # sequences are indexed in order, so the oldest is always first
+            for token in tokenize(text):
+                self._unpost(self._tokenIndex, self._tokenHeads, token)
+            self._unpost(self._levelIndex, self._levelHeads, level)
+
+        if self._filtered is None:
+            self.beginRemoveRows(QtCore.QModelIndex(), 0, count - 1)
+            self._firstSeq += count
+            self.endRemoveRows()
+        else:
+            self._firstSeq += count
+            filtered = self._filtered
+            removed = 0
+            while removed < len(filtered) and filtered[removed] < self._firstSeq:
+                removed += 1
+
+            if removed:
+                self.beginRemoveRows(QtCore.QModelIndex(), 0, removed - 1)
+                for i in xrange(removed):
+                    filtered.popleft()
+                self.endRemoveRows()
+
+    def _postings(self, index, heads, key):
+        """
+        Returns the live sequence numbers stored for the inputed key.
+
+        :param      index | {<hashable> key: <array.array>, ..}
+                    heads | {<hashable> key: <int> offset, ..}
+                    key | <hashable>
+
+        :return     <array.array> || ()
+        """
+        postings = index.get(key)
+        if postings is None:
+            return ()
+
+        head = heads.get(key)
+        if head:
+            return postings[head:]
+        return postings
+
+    def _unpost(self, index, heads, key):
+        """
+        Drops the oldest sequence number stored for the inputed key.  The
+        array is only shifted once enough entries have been dropped, so
+        eviction stays amortized constant time.
+
+        :param      index | {<hashable> key: <array.array>, ..}
+                    heads | {<hashable> key: <int> offset, ..}
+                    key | <hashable>
+        """
+        postings = index[key]
+        head = heads.get(key, 0) + 1
+        if head == len(postings):
+            del index[key]
+            heads.pop(key, None)
+        elif head >= COMPACT_THRESHOLD and head * 2 >= len(postings):
+            del postings[:head]
+            del heads[key]
+        else:
+            heads[key] = head
+
+    def _isMatch(self, level, tokens):
+        """
+        Returns whether or not a line matches the current filter.
+
+        :param      level | <int>
+                    tokens | <frozenset>
+
+        :return     <bool>
+        """
+        if self._filterLevel is not None and level < self._filterLevel:
+            return False
+        return self._filterTokens <= tokens
+
+    def _line(self, row):
+        """
+        Returns the (level, text) stored for the inputed row.
+
+        :param      row | <int>
+
+        :return     <tuple> || None
+        """
+        if self._filtered is None:
+            seq = self._firstSeq + row
+        else:
+            seq = self._filtered[row]
+        return self._lines[seq % self._capacity]
+
+    def append(self, text, level=logging.INFO):
+        """
+        Queues the inputed line to be added on the next flush.  This method
+        is safe to call from any thread.
+
+        :param      text | <str>
+                    level | <int>
+        """
+        self._queue.append((level, text))
+
+    def capacity(self):
+        """
+        Returns the maximum number of lines kept by this model.
+
+        :return     <int>
+        """
+        return self._capacity
+
+    def clear(self):
+        """
+        Removes all of the lines from this model.
+        """
+        self.beginResetModel()
+        self._lines = [None] * self._capacity
+        self._firstSeq = self._nextSeq
+        self._tokenIndex.clear()
+        self._tokenHeads.clear()
+        self._levelIndex.clear()
+        self._levelHeads.clear()
+        if self._filtered is not None:
+            self._filtered = collections.deque()
+        self.endResetModel()
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        """
+        Returns the data for the inputed index and role.
+
+        :param      index | <QtCore.QModelIndex>
+                    role  | <QtCore.Qt.ItemDataRole>
+
+        :return     <variant>
+        """
+        if not index.isValid():
+            return None
+
+        if role == QtCore.Qt.DisplayRole:
+            return self._line(index.row())[1]
+        elif role == XLogModel.LevelRole:
+            return self._line(index.row())[0]
+        return None
+
+    def flush(self):
+        """
+        Inserts all of the queued lines into the model as a single batch.
+        """
+        queue = self._queue
+        count = len(queue)
+        if not count:
+            return
+
+        # the queue may continue to grow from other threads while draining
+        batch = [queue.popleft() for i in xrange(count)]
+
+        # lines older than the capacity would be evicted immediately
+        capacity = self._capacity
+        skipped = max(0, count - capacity)
+        if skipped:
+            batch = batch[skipped:]
+
+        size = self._nextSeq - self._firstSeq
+        self._evict(min(size, max(0, size + count - capacity)))
+
+        if skipped:
+            self._nextSeq += skipped
+            self._firstSeq = max(self._firstSeq, self._nextSeq)
+
+        lines = self._lines
+        tokenIndex = self._tokenIndex
+        levelIndex = self._levelIndex
+        matches = []
+        seq = self._nextSeq
+
+        for level, text in batch:
+            tokens = tokenize(text)
+            lines[seq % capacity] = (level, text)
+
+            for token in tokens:
+                try:
+                    tokenIndex[token].append(seq)
+                except KeyError:
+                    tokenIndex[token] = array.array('l', (seq,))
+
+            try:
+                levelIndex[level].append(seq)
+            except KeyError:
+                levelIndex[level] = array.array('l', (seq,))
+
+            if self._filtered is not None and self._isMatch(level, tokens):
+                matches.append(seq)
+
+            seq += 1
+
+        if self._filtered is None:
+            first = self._nextSeq - self._firstSeq
+            self.beginInsertRows(QtCore.QModelIndex(), first, first + len(batch) - 1)
+            self._nextSeq = seq
+            self.endInsertRows()
+        else:
+            self._nextSeq = seq
+            if matches:
+                first = len(self._filtered)
+                self.beginInsertRows(QtCore.QModelIndex(), first, first + len(matches) - 1)
+                self._filtered.extend(matches)
+                self.endInsertRows()
+
+    def flushInterval(self):
+        """
+        Returns the number of milliseconds between batched inserts.
+
+        :return     <int>
+        """
+        return self._flushTimer.interval()
+
+    def rowCount(self, index=QtCore.QModelIndex()):
+        """
+        Returns the number of visible lines in this model.
+
+        :param      index | <QtCore.QModelIndex>
+
+        :return     <int>
+        """
+        if index.isValid():
+            return 0
+        elif self._filtered is None:
+            return self._nextSeq - self._firstSeq
+        return len(self._filtered)
+
+    def setFilter(self, text='', minimumLevel=None):
+        """
+        Filters the visible lines to those containing every word in the
+        inputed text at or above the given level.  Candidates are pulled from
+        the shortest matching index rather than scanning every line.
+
+        :param      text | <str>
+                    minimumLevel | <int> || None
+        """
+        tokens = tokenize(text or '')
+
+        self.beginResetModel()
+        self._filterTokens = tokens
+        self._filterLevel = minimumLevel
+
+        if not tokens and minimumLevel is None:
+            self._filtered = None
+
+        elif tokens:
+            postings = [self._postings(self._tokenIndex, self._tokenHeads, token)
+                        for token in tokens]
+            candidates = min(postings, key=len)
+            self._filtered = collections.deque()
+            for seq in candidates:
+                level, text = self._lines[seq % self._capacity]
+                if self._isMatch(level, tokenize(text)):
+                    self._filtered.append(seq)
+
+        else:
+            postings = [self._postings(self._levelIndex, self._levelHeads, level)
+                        for level in self._levelIndex if level >= minimumLevel]
+            self._filtered = collections.deque(heapq.merge(*postings))
+
+        self.endResetModel()
+
+    def setFlushInterval(self, msecs):
+        """
+        Sets the number of milliseconds between batched inserts.
+
+        :param      msecs | <int>
+        """
+        self._flushTimer.setInterval(msecs)
+
+#----------------------------------------------------------------------
+
+class XLogHandler(logging.Handler):
+    """ Logging handler that feeds records to an XLogModel from any thread """
+    def __init__(self, model, level=logging.NOTSET):
+        super(XLogHandler, self).__init__(level)
+
+        self._model = model
+
+    def emit(self, record):
+        try:
+            self._model.append(self.format(record), record.levelno)
+        except StandardError:
+            self.handleError(record)
+
+#----------------------------------------------------------------------
+
+class XLogView(QtGui.QListView):
+    def __init__(self, parent=None, capacity=DEFAULT_CAPACITY):
+        super(XLogView, self).__init__(parent)
+
+        # define custom properties
+        self._followTail = True
+
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QtGui.QAbstractItemView.ExtendedSelection)
+        self.setEditTriggers(QtGui.QAbstractItemView.NoEditTriggers)
+        self.setModel(XLogModel(capacity, self))
+
+    def _checkTail(self, *args):
+        """
+        Records whether or not the view is scrolled to the end before new
+        lines are inserted.
+        """
+        bar = self.verticalScrollBar()
+        self._followTail = bar.value() == bar.maximum()
+
+    def _scrollToTail(self, *args):
+        """
+        Keeps the newest line visible if the view was already at the end.
+        """
+        if self._followTail:
+            self.scrollToBottom()
+
+    def setModel(self, model):
+        """
+        Sets the model for this view, tracking inserts to follow the tail.
+
+        :param      model | <XLogModel>
+        """
+        old = self.model()
+        if old is not None:
+            try:
+                old.rowsAboutToBeInserted.disconnect(self._checkTail)
+                old.rowsInserted.disconnect(self._scrollToTail)
+            except (RuntimeError, TypeError):
+                pass
+
+        super(XLogView, self).setModel(model)
+
+        if model is not None:
+            model.rowsAboutToBeInserted.connect(self._checkTail)
+            model.rowsInserted.connect(self._scrollToTail)
+
@@ -0,0 +1,439 @@
+"""
+Defines the XRenderPool class, which renders images in a set of headless
+worker processes instead of on the GUI thread.
+
+Jobs are described by picklable XRenderJob instances that reference a
+drawing function by its dotted import path.  Each worker is a fresh Python
+interpreter that imports xqt without a display and owns a fixed slot within
+a file backed block of shared memory.  Workers paint directly into their
+slot, so only the job id and image geometry travel back over the connection
+and the host makes a single copy of the pixels when it receives them.
+
+Workers are started with the same sys.path as the host process, so drawing
+functions must live in modules the host can import.
+
+:usage      |def drawThumb(painter, rect, text=''):
+            |    painter.fillRect(rect, QtGui.QColor('white'))
+            |    painter.drawText(rect, QtCore.Qt.AlignCenter, text)
+            |
+            |pool = XRenderPool()
+            |jobs = [XRenderJob('mytool.thumbs.drawThumb', (128, 128), text=str(i))
+            |        for i in range(1000)]
+            |for i, image in pool.render(jobs):
+            |    thumbs[i] = image
+            |pool.close()
+"""
+
+# define authorship information
+__authors__         = ['Eric Hulser']
+__author__          = ','.join(__authors__)
+__credits__         = []
+__copyright__       = 'Copyright (c) 2012, Projex Software'
+__license__         = 'LGPL'
+
+# maintenance information
+__maintainer__      = 'Projex Software'
+__email__           = 'team@projexsoftware.com'
+
+import binascii
+import ctypes
+import logging
+import mmap
+import multiprocessing
+import os
+import select
+import socket
+import subprocess
+import sys
+import tempfile
+import traceback
+
+from multiprocessing.connection import Client, Listener
+
+from xqt import QtGui, QT_WRAPPER
+
+log = logging.getLogger(__name__)
+
+# default slot size will hold a 1024x1024 32-bit image
+DEFAULT_SLOT_SIZE = 1024 * 1024 * 4
+
+# seconds to wait on results before checking that the workers are alive
+POLL_INTERVAL = 1.0
+
+# seconds to wait for a new worker to connect to the pool
+STARTUP_TIMEOUT = 60
+
+
+class XRenderJob(object):
+    """
+    Picklable description of a single render.  The painter function is
+    referenced by its import path so that it can be resolved within the
+    worker process, and will be called as function(painter, rect, **options).
+    """
+    def __init__(self, function, size, **options):
+        self.function = function
+        self.size = tuple(size)
+        self.options = options
+
+    def __repr__(self):
+        return '<XRenderJob {0} {1}x{2}>'.format(self.function, *self.size)
+
+#----------------------------------------------------------------------
+
+def _resolve(path):
+    """
+    Imports and returns the function defined by the inputed dotted path.
+
+    :param      path | <str>
+
+    :return     <callable>
+    """
+    module_name, _, func_name = path.rpartition('.')
+    __import__(module_name)
+    return getattr(sys.modules[module_name], func_name)
+
+def _slotImage(mapped, offset, width, height):
+    """
+    Returns a QImage that uses the pixels stored in the shared memory at the
+    inputed offset, without copying them.  The image is only valid while the
+    returned buffer is referenced.
+
+    :param      mapped | <mmap.mmap>
+                offset | <int>
+                width | <int>
+                height | <int>
+
+    :return     (<QtGui.QImage>, <ctypes.Array> buffer)
+    """
+    bpl = width * 4
+    view = (ctypes.c_char * (bpl * height)).from_buffer(mapped, offset)
+    image = QtGui.QImage(view, width, height, bpl, QtGui.QImage.Format_ARGB32_Premultiplied)
+    return image, view
+
+def _renderWorker(address, authkey, path, slot, slot_size):
+    """
+    Main loop for a render process.  Renders each job received from the host
+    directly into this worker's slot of the shared memory until a None job
+    is received.
+    """
+    from xqt import QtCore, QtGui
+
+    # a non-GUI application can render fonts to an image without needing
+    # to connect to a display
+    app = QtCore.QCoreApplication.instance()
+    if app is None:
+        app = QtGui.QApplication([], False)
+
+    with open(path, 'r+b') as f:
+        mapped = mmap.mmap(f.fileno(), 0)
+
+    conn = Client(address, authkey=authkey)
+    conn.send(slot)
+    offset = slot * slot_size
+    functions = {}
+
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+
+        job_id, job = job
+        try:
+            func = functions.get(job.function)
+            if func is None:
+                func = functions[job.function] = _resolve(job.function)
+
+            width, height = job.size
+            if width * 4 * height > slot_size:
+                raise ValueError('Image of {0}x{1} exceeds the slot size of {2}'.format(width, height, slot_size))
+
+            image, view = _slotImage(mapped, offset, width, height)
+            image.fill(0)
+
+            painter = QtGui.QPainter(image)
+            try:
+                func(painter, QtCore.QRect(0, 0, width, height), **job.options)
+            finally:
+                painter.end()
+
+            del image, view
+            conn.send((job_id, width, height, None))
+
+        except Exception:
+            conn.send((job_id, 0, 0, traceback.format_exc()))
+
+    conn.close()
+    mapped.close()
+
+#----------------------------------------------------------------------
+
+class XRenderWorker(object):
+    """ Host side handle for a single render process """
+    def __init__(self, slot, process):
+        self.slot = slot
+        self.process = process
+        self.conn = None
+        self.job = None
+
+    def isAlive(self):
+        return self.process.poll() is None
+
+#----------------------------------------------------------------------
+
+class XRenderPool(object):
+    """
+    Pool of headless render processes.  Each worker renders one job at a
+    time into its own shared memory slot.
+    """
+    def __init__(self, processes=None, slotSize=DEFAULT_SLOT_SIZE):
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+
+        # keep slots aligned to pages so workers never share one
+        slotSize += -slotSize % mmap.PAGESIZE
+
+        self._slotSize = slotSize
+        self._workers = []
+        self._rendering = False
+
+        # back the slots with a file, preferring memory backed storage
+        tempdir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        handle, self._path = tempfile.mkstemp(prefix='xqt_render_', dir=tempdir)
+        os.ftruncate(handle, slotSize * processes)
+        self._mapped = mmap.mmap(handle, 0)
+        os.close(handle)
+
+        # start each worker from a fresh interpreter so it never inherits
+        # the host application's Qt state
+        authkey = os.urandom(16)
+
+        # the listening socket inherits the default timeout, so accept will
+        # fail rather than block forever if a worker does not start
+        timeout = socket.getdefaulttimeout()
+        socket.setdefaulttimeout(STARTUP_TIMEOUT)
+        try:
+            listener = Listener(('127.0.0.1', 0), authkey=authkey)
+        finally:
+            socket.setdefaulttimeout(timeout)
+
+        env = os.environ.copy()
+        env['XQT_WRAPPER'] = QT_WRAPPER
+        env['PYTHONPATH'] = os.pathsep.join(path for path in sys.path if path)
+
+        try:
+            for slot in range(processes):
+                args = [sys.executable,
+                        '-m', __name__,
+                        '{0}:{1}'.format(*listener.address),
+                        self._path,
+                        str(slot),
+                        str(slotSize)]
+
+                # pass the key through stdin so it does not show in the
+                # process list
+                proc = subprocess.Popen(args, env=env, stdin=subprocess.PIPE)
+                proc.stdin.write(binascii.hexlify(authkey) + '\n')
+                proc.stdin.close()
+                self._workers.append(XRenderWorker(slot, proc))
+
+            for i in range(processes):
+                conn = listener.accept()
+                slot = conn.recv()
+                self._workers[slot].conn = conn
+        except StandardError:
+            self.close()
+            raise
+        finally:
+            listener.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _discard(self, worker):
+        """
+        Removes the inputed dead worker from the pool and reaps its process
+        so it does not linger as a zombie.
+
+        :param      worker | <XRenderWorker>
+        """
+        log.error('Render worker %s exited unexpectedly', worker.slot)
+        self._workers.remove(worker)
+
+        try:
+            worker.conn.close()
+        except IOError:
+            pass
+
+        # the connection can drop before the process has fully exited
+        if worker.isAlive():
+            worker.process.kill()
+        worker.process.wait()
+
+    def _receive(self, worker):
+        """
+        Reads the result for the job running on the inputed worker.  Returns
+        None and removes the worker from the pool if it has died.
+
+        :param      worker | <XRenderWorker>
+
+        :return     (<int> job_id, <int> width, <int> height, <str> error) || None
+        """
+        try:
+            return worker.conn.recv()
+        except (EOFError, IOError):
+            self._discard(worker)
+            return None
+
+    def _wait(self, busy):
+        """
+        Waits for any of the inputed busy workers to have a result ready,
+        removing any workers that die while waiting.
+
+        :param      busy | [<XRenderWorker>, ..]
+
+        :return     [<XRenderWorker>, ..] ready, [<XRenderWorker>, ..] dead
+        """
+        lookup = dict((worker.conn.fileno(), worker) for worker in busy)
+        ready, _, _ = select.select(lookup.keys(), [], [], POLL_INTERVAL)
+        ready = [lookup[fileno] for fileno in ready]
+
+        dead = []
+        if not ready:
+            for worker in busy:
+                if not worker.isAlive():
+                    self._discard(worker)
+                    dead.append(worker)
+        return ready, dead
+
+    def close(self):
+        """
+        Stops all of the worker processes for this pool.
+        """
+        for worker in self._workers:
+            if worker.conn is not None:
+                try:
+                    worker.conn.send(None)
+                    worker.conn.close()
+                except IOError:
+                    pass
+
+        for worker in self._workers:
+            if worker.conn is None:
+                worker.process.kill()
+            worker.process.wait()
+
+        self._workers = []
+
+        if self._mapped is not None:
+            self._mapped.close()
+            self._mapped = None
+            try:
+                os.remove(self._path)
+            except OSError:
+                pass
+
+    def processCount(self):
+        """
+        Returns the number of worker processes for this pool.
+
+        :return     <int>
+        """
+        return len(self._workers)
+
+    def render(self, jobs):
+        """
+        Submits the inputed jobs to the workers and yields the resulting
+        images as they complete.  Results may arrive out of order, so the
+        index of the job within the inputed list is returned with each image.
+        Failed jobs are logged and yield a null image.  If iteration is
+        stopped early, the jobs still running are waited on and the rest are
+        discarded.
+
+        :param      jobs | [<XRenderJob>, ..]
+
+        :return     <generator> (<int> index, <QtGui.QImage>)
+        """
+        if not self._workers:
+            raise RuntimeError('XRenderPool has been closed')
+        elif self._rendering:
+            raise RuntimeError('XRenderPool is already rendering')
+
+        pending = list(enumerate(jobs))
+        pending.reverse()
+        idle = list(self._workers)
+        busy = []
+
+        self._rendering = True
+        try:
+            while pending or busy:
+                if not self._workers:
+                    raise RuntimeError('All render workers have exited')
+
+                while pending and idle:
+                    worker = idle.pop()
+                    index, job = pending.pop()
+                    worker.job = index
+                    worker.conn.send((index, job))
+                    busy.append(worker)
+
+                ready, dead = self._wait(busy)
+                for worker in dead:
+                    busy.remove(worker)
+                    yield worker.job, QtGui.QImage()
+
+                for worker in ready:
+                    busy.remove(worker)
+                    result = self._receive(worker)
+                    if result is None:
+                        yield worker.job, QtGui.QImage()
+                        continue
+
+                    idle.append(worker)
+                    job_id, width, height, error = result
+                    if job_id != worker.job:
+                        log.error('Discarding unexpected result from render worker %s', worker.slot)
+                        continue
+                    elif error:
+                        log.error('Failed to render job %s:\n%s', job_id, error)
+                        yield job_id, QtGui.QImage()
+                        continue
+
+                    # copy the pixels out of the slot before it is reused
+                    image, view = _slotImage(self._mapped, worker.slot * self._slotSize, width, height)
+                    image = image.copy()
+                    del view
+                    yield job_id, image
+        finally:
+            # collect the jobs still running so their slots are free for the
+            # next call
+            while busy:
+                ready, dead = self._wait(busy)
+                for worker in dead + ready:
+                    busy.remove(worker)
+                for worker in ready:
+                    self._receive(worker)
+            self._rendering = False
+
+    def renderAll(self, jobs):
+        """
+        Renders the inputed jobs and returns the images in the same order.
+
+        :param      jobs | [<XRenderJob>, ..]
+
+        :return     [<QtGui.QImage>, ..]
+        """
+        jobs = list(jobs)
+        output = [None] * len(jobs)
+        for index, image in self.render(jobs):
+            output[index] = image
+        return output
+
+#----------------------------------------------------------------------
+
+if __name__ == '__main__':
+    host, port = sys.argv[1].rsplit(':', 1)
+    authkey = binascii.unhexlify(sys.stdin.readline().strip())
+    _renderWorker((host, int(port)), authkey, sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
@@ -0,0 +1,341 @@
+"""
+Defines the XNetworkSession class, which shares a single
+QNetworkAccessManager per thread so that widgets reuse keep-alive connections
+instead of each creating their own manager.
+
+On top of the shared manager, the session limits the number of requests that
+are active for each host, merges identical GET requests that are already in
+flight and can persist responses to an on-disk cache that is revalidated
+against the server using the standard HTTP caching headers.
+
+:usage      |session = XNetworkSession.instance()
+            |session.setCacheDirectory(os.path.expanduser('~/.cache/mytool'))
+            |
+            |reply = session.get('http://localhost:8000/assets.json')
+            |reply.finished.connect(self.showAssets)
+"""
+
+# define authorship information
+__authors__         = ['Eric Hulser']
+__author__          = ','.join(__authors__)
+__credits__         = []
+__copyright__       = 'Copyright (c) 2012, Projex Software'
+__license__         = 'LGPL'
+
+# maintenance information
+__maintainer__      = 'Projex Software'
+__email__           = 'team@projexsoftware.com'
+
+import collections
+import logging
+import threading
+
+from xqt import QtCore, QtNetwork, q2py
+
+log = logging.getLogger(__name__)
+
+# the number of connections Qt will open to a single host
+DEFAULT_MAX_PER_HOST = 6
+DEFAULT_CACHE_SIZE = 50 * 1024 * 1024
+
+
+class XNetworkReply(QtCore.QObject):
+    """
+    Result of a request made through an XNetworkSession.  When identical GET
+    requests are merged, all callers share the same reply instance.  Replies
+    are not parented to the session, so they are released along with the
+    last reference the caller holds to them.
+    """
+    finished = QtCore.Signal(object)
+
+    def __init__(self, method, url, parent=None):
+        super(XNetworkReply, self).__init__(parent)
+
+        # define custom properties
+        self._method = method
+        self._url = url
+        self._data = ''
+        self._error = 0
+        self._errorString = ''
+        self._statusCode = 0
+        self._fromCache = False
+        self._isFinished = False
+
+    def data(self):
+        """
+        Returns the body of the response.
+
+        :return     <str>
+        """
+        return self._data
+
+    def error(self):
+        """
+        Returns the QNetworkReply error code for this response.
+
+        :return     <int>
+        """
+        return self._error
+
+    def errorString(self):
+        """
+        Returns the error message for this response.
+
+        :return     <str>
+        """
+        return self._errorString
+
+    def isFinished(self):
+        """
+        Returns whether or not this response has completed.
+
+        :return     <bool>
+        """
+        return self._isFinished
+
+    def isFromCache(self):
+        """
+        Returns whether or not this response was served from the disk cache.
+
+        :return     <bool>
+        """
+        return self._fromCache
+
+    def method(self):
+        """
+        Returns the HTTP method used for this request.
+
+        :return     <str>
+        """
+        return self._method
+
+    def statusCode(self):
+        """
+        Returns the HTTP status code for this response.
+
+        :return     <int>
+        """
+        return self._statusCode
+
+    def url(self):
+        """
+        Returns the url that was requested.
+
+        :return     <str>
+        """
+        return self._url
+
+#----------------------------------------------------------------------
+
+class XNetworkSession(QtCore.QObject):
+    _sessions = threading.local()
+
+    def __init__(self, parent=None):
+        super(XNetworkSession, self).__init__(parent)
+
+        # define custom properties
+        self._manager = QtNetwork.QNetworkAccessManager(self)
+        self._maxPerHost = DEFAULT_MAX_PER_HOST
+        self._active = collections.defaultdict(int)
+        self._pending = collections.defaultdict(collections.deque)
+        self._inflight = {}
+
+    def _dispatch(self, host):
+        """
+        Starts as many pending requests for the inputed host as the per-host
+        limit allows.
+
+        :param      host | <str>
+        """
+        pending = self._pending[host]
+        while pending and self._active[host] < self._maxPerHost:
+            self._active[host] += 1
+            self._start(host, *pending.popleft())
+
+        if not pending:
+            self._pending.pop(host, None)
+
+    def _finish(self, host, key, xreply, qreply):
+        """
+        Copies the results of the Qt reply to the session reply and starts
+        the next request for the host.
+        """
+        status = q2py(qreply.attribute(QtNetwork.QNetworkRequest.HttpStatusCodeAttribute))
+        cached = q2py(qreply.attribute(QtNetwork.QNetworkRequest.SourceIsFromCacheAttribute))
+
+        xreply._data = str(qreply.readAll())
+        xreply._error = int(qreply.error())
+        xreply._errorString = qreply.errorString() if xreply._error else ''
+        xreply._statusCode = int(status or 0)
+        xreply._fromCache = bool(cached)
+        xreply._isFinished = True
+        qreply.deleteLater()
+
+        if key is not None:
+            self._inflight.pop(key, None)
+
+        self._active[host] -= 1
+        if self._active[host] <= 0:
+            self._active.pop(host, None)
+        self._dispatch(host)
+
+        xreply.finished.emit(xreply)
+
+    def _start(self, host, key, xreply, request, data):
+        """
+        Sends the inputed request through the shared manager.
+        """
+        method = xreply.method()
+        if method == 'GET':
+            qreply = self._manager.get(request)
+        elif method == 'HEAD':
+            qreply = self._manager.head(request)
+        elif method == 'DELETE':
+            qreply = self._manager.deleteResource(request)
+        elif method == 'POST':
+            qreply = self._manager.post(request, data)
+        elif method == 'PUT':
+            qreply = self._manager.put(request, data)
+        else:
+            buff = QtCore.QBuffer(xreply)
+            buff.setData(data)
+            qreply = self._manager.sendCustomRequest(request, method, buff)
+
+        qreply.finished.connect(lambda: self._finish(host, key, xreply, qreply))
+
+    def cacheDirectory(self):
+        """
+        Returns the directory used for the on-disk response cache.
+
+        :return     <str>
+        """
+        cache = self._manager.cache()
+        if cache is None:
+            return ''
+        return cache.cacheDirectory()
+
+    def get(self, url, headers=None):
+        """
+        Requests the inputed url.  If an identical GET is already in flight,
+        its reply is returned instead of issuing a new request.
+
+        :param      url | <str>
+                    headers | {<str> key: <str> value, ..} || None
+
+        :return     <XNetworkReply>
+        """
+        return self.request('GET', url, headers=headers)
+
+    def manager(self):
+        """
+        Returns the shared network access manager for this session.
+
+        :return     <QtNetwork.QNetworkAccessManager>
+        """
+        return self._manager
+
+    def maxConnectionsPerHost(self):
+        """
+        Returns the maximum number of active requests per host.
+
+        :return     <int>
+        """
+        return self._maxPerHost
+
+    def post(self, url, data, headers=None):
+        """
+        Posts the inputed data to the given url.
+
+        :param      url | <str>
+                    data | <str>
+                    headers | {<str> key: <str> value, ..} || None
+
+        :return     <XNetworkReply>
+        """
+        return self.request('POST', url, data=data, headers=headers)
+
+    def request(self, method, url, data='', headers=None):
+        """
+        Queues a request for the inputed url, sending it once the host has
+        a free connection.
+
+        :param      method | <str>
+                    url | <str>
+                    data | <str>
+                    headers | {<str> key: <str> value, ..} || None
+
+        :return     <XNetworkReply>
+        """
+        method = method.upper()
+        headers = headers or {}
+        data = data or ''
+
+        # merge identical reads that are still in flight
+        key = None
+        if method == 'GET':
+            key = (url, tuple(sorted(headers.items())))
+            try:
+                return self._inflight[key]
+            except KeyError:
+                pass
+
+        qurl = QtCore.QUrl(url)
+        request = QtNetwork.QNetworkRequest(qurl)
+        request.setAttribute(QtNetwork.QNetworkRequest.CacheLoadControlAttribute,
+                             QtNetwork.QNetworkRequest.PreferNetwork)
+        for header, value in headers.items():
+            request.setRawHeader(str(header), str(value))
+
+        xreply = XNetworkReply(method, url)
+        if key is not None:
+            self._inflight[key] = xreply
+
+        host = '{0}:{1}'.format(qurl.host(), qurl.port())
+        self._pending[host].append((key, xreply, request, data))
+        self._dispatch(host)
+        return xreply
+
+    def setCacheDirectory(self, path, maximumSize=DEFAULT_CACHE_SIZE):
+        """
+        Sets the directory used to store responses on disk.  Cached
+        responses are revalidated with the server using the ETag and
+        Last-Modified headers once they are no longer fresh.
+
+        :param      path | <str> || None
+                    maximumSize | <int> bytes
+        """
+        if not path:
+            self._manager.setCache(None)
+            return
+
+        cache = QtNetwork.QNetworkDiskCache(self._manager)
+        cache.setCacheDirectory(path)
+        cache.setMaximumCacheSize(maximumSize)
+        self._manager.setCache(cache)
+
+    def setMaxConnectionsPerHost(self, count):
+        """
+        Sets the maximum number of active requests per host.
+
+        :param      count | <int>
+        """
+        self._maxPerHost = max(1, count)
+        for host in self._pending.keys():
+            self._dispatch(host)
+
+    @classmethod
+    def instance(cls):
+        """
+        Returns the session for the current thread, creating it if needed.
+        Qt requires a network manager to be used from the thread it was
+        created in, so each thread shares its own session.
+
+        :return     <XNetworkSession>
+        """
+        try:
+            return cls._sessions.session
+        except AttributeError:
+            session = cls()
+            cls._sessions.session = session
+            return session
+
@@ -0,0 +1,256 @@
+"""
+Defines an opt-in profiler for form loading.  When enabled, the xqt loaders
+record the time spent creating each widget, layout and action, importing
+custom widget modules and connecting slots by name.  A hierarchical report
+is logged for each form, and if an output directory is provided a Chrome
+trace file (viewable in chrome://tracing) is written per form as well.
+
+The profiler can be enabled by setting the XQT_UI_PROFILE environment
+variable to an output directory (or to 1 to only log the reports), or from
+code:
+
+:usage      |from xqt import uiprofiler
+            |uiprofiler.enable('/tmp/ui_traces')
+            |dlg = MyDialog()   # calls uic.loadUi
+            |uiprofiler.disable()
+"""
+
+# define authorship information
+__authors__         = ['Eric Hulser']
+__author__          = ','.join(__authors__)
+__credits__         = []
+__copyright__       = 'Copyright (c) 2012, Projex Software'
+__license__         = 'LGPL'
+
+# maintenance information
+__maintainer__      = 'Projex Software'
+__email__           = 'team@projexsoftware.com'
+
+import json
+import logging
+import os
+import threading
+import time
+
+from timeit import default_timer
+
+log = logging.getLogger(__name__)
+
+_profiler = None
+
+
+class XUiSpan(object):
+    """ Timing record for a single step of loading a form """
+    __slots__ = ('name', 'category', 'start', 'duration', 'children')
+
+    def __init__(self, name, category, start):
+        self.name = name
+        self.category = category
+        self.start = start
+        self.duration = 0.0
+        self.children = []
+
+#----------------------------------------------------------------------
+
+class XUiSpanContext(object):
+    """ Context manager that opens and closes a span on a profiler """
+    __slots__ = ('_profiler', '_name', '_category')
+
+    def __init__(self, profiler, name, category):
+        self._profiler = profiler
+        self._name = name
+        self._category = category
+
+    def __enter__(self):
+        self._profiler.beginSpan(self._name, self._category)
+
+    def __exit__(self, *args):
+        self._profiler.endSpan()
+
+#----------------------------------------------------------------------
+
+class XUiNullContext(object):
+    """ Context manager used while the profiler is disabled """
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+NULL_CONTEXT = XUiNullContext()
+
+#----------------------------------------------------------------------
+
+class XUiProfiler(object):
+    def __init__(self, directory=None):
+        self._directory = directory
+        self._stack = []
+
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def beginSpan(self, name, category=''):
+        """
+        Starts timing a new step nested within the current one.
+
+        :param      name | <str>
+                    category | <str>
+        """
+        span = XUiSpan(name, category, default_timer())
+        if self._stack:
+            self._stack[-1].children.append(span)
+        self._stack.append(span)
+
+    def chromeTrace(self, root):
+        """
+        Converts the inputed form span to the Chrome trace event format.
+
+        :param      root | <XUiSpan>
+
+        :return     {<str> key: <variant> value, ..}
+        """
+        pid = os.getpid()
+        tid = threading.current_thread().ident or 0
+        events = []
+
+        def collect(span):
+            events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': (span.start - root.start) * 1e6,
+                'dur': span.duration * 1e6,
+                'pid': pid,
+                'tid': tid
+            })
+            for child in span.children:
+                collect(child)
+
+        collect(root)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def directory(self):
+        """
+        Returns the directory trace files are written to.
+
+        :return     <str> || None
+        """
+        return self._directory
+
+    def endSpan(self):
+        """
+        Stops timing the current step.  When the outermost span for a form
+        is closed, its report is emitted.
+
+        :return     <XUiSpan>
+        """
+        span = self._stack.pop()
+        span.duration = default_timer() - span.start
+        if not self._stack:
+            self.emit(span)
+        return span
+
+    def emit(self, root):
+        """
+        Logs the hierarchical report for the inputed form span and writes
+        its Chrome trace file when an output directory is set.
+
+        :param      root | <XUiSpan>
+        """
+        log.info('form load profile:\n%s', self.report(root))
+
+        if not self._directory:
+            return
+
+        basename = os.path.splitext(os.path.basename(root.name))[0]
+        filename = '{0}.{1}.trace.json'.format(basename, int(time.time() * 1000))
+        path = os.path.join(self._directory, filename)
+        try:
+            with open(path, 'w') as f:
+                json.dump(self.chromeTrace(root), f)
+        except (IOError, OSError):
+            log.exception('Could not write ui trace: %s', path)
+
+    def report(self, root):
+        """
+        Returns a hierarchical text report for the inputed form span.
+
+        :param      root | <XUiSpan>
+
+        :return     <str>
+        """
+        lines = []
+
+        def collect(span, depth):
+            lines.append('{0:>9.2f} ms  {1}{2:<8} {3}'.format(span.duration * 1000,
+                                                              '  ' * depth,
+                                                              span.category,
+                                                              span.name))
+            for child in span.children:
+                collect(child, depth + 1)
+
+        collect(root, 0)
+        return '\n'.join(lines)
+
+    def span(self, name, category=''):
+        """
+        Returns a context manager timing the inputed step.
+
+        :param      name | <str>
+                    category | <str>
+
+        :return     <XUiSpanContext>
+        """
+        return XUiSpanContext(self, name, category)
+
+#----------------------------------------------------------------------
+
+def active():
+    """
+    Returns the active profiler, if profiling is enabled.
+
+    :return     <XUiProfiler> || None
+    """
+    return _profiler
+
+def disable():
+    """
+    Turns off form load profiling.
+    """
+    global _profiler
+    _profiler = None
+
+def enable(directory=None):
+    """
+    Turns on form load profiling, writing Chrome trace files to the inputed
+    directory if provided.
+
+    :param      directory | <str> || None
+
+    :return     <XUiProfiler>
+    """
+    global _profiler
+    _profiler = XUiProfiler(directory)
+    return _profiler
+
+def span(name, category=''):
+    """
+    Returns a context manager timing the inputed step on the active profiler,
+    or a no-op context when profiling is disabled.
+
+    :param      name | <str>
+                category | <str>
+
+    :return     <XUiSpanContext> || <XUiNullContext>
+    """
+    if _profiler is None:
+        return NULL_CONTEXT
+    return _profiler.span(name, category)
+
+# enable from the environment
+_env = os.environ.get('XQT_UI_PROFILE')
+if _env:
+    enable(None if _env == '1' else _env)
+
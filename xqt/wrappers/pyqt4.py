@@ -29,7 +29,8 @@ if SIP_VERSION == '2':
     sip.setapi('QUrl', 2)
 
 from PyQt4 import QtCore
-from ..lazyload import lazy_import
+from .. import diagnostics, uiprofiler
+from ..lazyload import LazyModule, lazy_import
 
 # define wrappers
 def py2q(py_object):
@@ -46,6 +47,9 @@ def q2py(q_variant, default=None):
     else:
         return q_variant.toPyObject()
 
+def isDeleted(q_object):
+    return sip.isdeleted(q_object)
+
 SIGNAL_BASE = QtCore.SIGNAL
 
 def SIGNAL(signal):
@@ -104,6 +108,88 @@ class Slot(type):
 
 #----------------------------------------------------------------------
 
+def _profiled(func, category):
+    """
+    Wraps the inputed uic creator method to record a profiler span named
+    after the class and object name it is called with.
+    
+    :param      func | <callable>
+                category | <str>
+    
+    :return     <callable>
+    """
+    def wrapper(obj, classname, *args, **kwds):
+        name = args[0] if args and isinstance(args[0], basestring) else ''
+        with uiprofiler.span('{0} {1}'.format(classname, name).strip(), category):
+            return func(obj, classname, *args, **kwds)
+    return wrapper
+
+class Uic(LazyModule):
+    def loadUi(self, uifile, baseinstance=None, *args, **kwds):
+        """
+        Loads the inputed ui file through the PyQt4 uic module.  When form
+        profiling is enabled, the uic object creator is temporarily wrapped
+        to time each created object, custom widget import and slot connection.
+        Loaded forms are registered with the object census when enabled.
+        
+        :param      uifile | <str> || <file>
+                    baseinstance | <QWidget>
+        
+        :return     <QWidget>
+        """
+        uic = self.__load_module__()
+        formname = str(getattr(uifile, 'name', uifile))
+        
+        if uiprofiler.active() is None:
+            ui = uic.loadUi(uifile, baseinstance, *args, **kwds)
+        else:
+            ui = self._profileUi(uic, formname, uifile, baseinstance, *args, **kwds)
+        
+        diagnostics.track(ui, formname)
+        return ui
+    
+    def _profileUi(self, uic, formname, uifile, baseinstance, *args, **kwds):
+        # forms loaded while building another form are already patched
+        if self.__dict__.get('__profiling__'):
+            with uiprofiler.span(formname, 'form'):
+                return uic.loadUi(uifile, baseinstance, *args, **kwds)
+        
+        from PyQt4.uic import objcreator
+        
+        patches = [(objcreator.QObjectCreator, 'createQObject', 'object'),
+                   (getattr(objcreator, '_CustomWidgetLoader', None), 'search', 'import')]
+        originals = []
+        
+        for cls, method, category in patches:
+            if cls is None or method not in cls.__dict__:
+                continue
+            
+            func = cls.__dict__[method]
+            originals.append((cls, method, func))
+            setattr(cls, method, _profiled(func, category))
+        
+        connect = QtCore.QMetaObject.connectSlotsByName
+        
+        def connectSlotsByName(obj):
+            with uiprofiler.span('connectSlotsByName', 'slots'):
+                return connect(obj)
+        
+        originals.append((QtCore.QMetaObject,
+                          'connectSlotsByName',
+                          QtCore.QMetaObject.__dict__['connectSlotsByName']))
+        QtCore.QMetaObject.connectSlotsByName = staticmethod(connectSlotsByName)
+        
+        self.__dict__['__profiling__'] = True
+        try:
+            with uiprofiler.span(formname, 'form'):
+                return uic.loadUi(uifile, baseinstance, *args, **kwds)
+        finally:
+            self.__dict__['__profiling__'] = False
+            for cls, method, func in originals:
+                setattr(cls, method, func)
+
+#----------------------------------------------------------------------
+
 def init(scope):
     """
     Initialize the xqt system with the PyQt4 wrapper for the Qt system.
@@ -113,6 +199,7 @@ def init(scope):
     # update globals
     scope['py2q'] = py2q
     scope['q2py'] = q2py
+    scope['isDeleted'] = isDeleted
     
     # define wrapper compatibility symbols
     QtCore.THREADSAFE_NONE = None
@@ -128,7 +215,7 @@ def init(scope):
     scope['QtDesigner'] = lazy_import('PyQt4.QtDesigner')
     scope['Qsci'] = lazy_import('PyQt4.Qsci')
     
-    scope['uic'] = lazy_import('PyQt4.uic')
+    scope['uic'] = Uic('PyQt4.uic')
     scope['rcc_exe'] = 'pyrcc4'
     
     # map shared core properties
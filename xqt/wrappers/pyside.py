@@ -19,8 +19,13 @@ import sys
 import xml.parsers.expat
 
 from PySide import QtCore, QtGui, QtUiTools
+try:
+    import shiboken
+except ImportError:
+    from PySide import shiboken
 from xml.etree import ElementTree
 
+from .. import diagnostics, uiprofiler
 from ..lazyload import lazy_import
 
 log = logging.getLogger(__name__)
@@ -68,6 +73,11 @@ class XThreadNone(object):
 
 #----------------------------------------------------------------------
 
+def isDeleted(q_object):
+    return not shiboken.isValid(q_object)
+
+#----------------------------------------------------------------------
+
 SIGNAL_BASE = QtCore.SIGNAL
 
 def SIGNAL(signal):
@@ -100,7 +110,8 @@ class UiLoader(QtUiTools.QUiLoader):
         :param      parent | <QWidget> || None
                     name   | <str>
         """
-        action = super(UiLoader, self).createAction(parent, name)
+        with uiprofiler.span('QAction {0}'.format(name), 'action'):
+            action = super(UiLoader, self).createAction(parent, name)
         if not action.parent():
             action.setParent(self._baseinstance)
         setattr(self._baseinstance, name, action)
@@ -114,7 +125,8 @@ class UiLoader(QtUiTools.QUiLoader):
         :param      parent | <QWidget> || None
                     name   | <str>
         """
-        actionGroup = super(UiLoader, self).createActionGroup(parent, name)
+        with uiprofiler.span('QActionGroup {0}'.format(name), 'action'):
+            actionGroup = super(UiLoader, self).createActionGroup(parent, name)
         if not actionGroup.parent():
             actionGroup.setParent(self._baseinstance)
         setattr(self._baseinstance, name, actionGroup)
@@ -129,7 +141,8 @@ class UiLoader(QtUiTools.QUiLoader):
                     parent | <QWidget> || None
                     name   | <str>
         """
-        layout = super(UiLoader, self).createLayout(className, parent, name)
+        with uiprofiler.span('{0} {1}'.format(className, name), 'layout'):
+            layout = super(UiLoader, self).createLayout(className, parent, name)
         setattr(self._baseinstance, name, layout)
         return layout
     
@@ -146,23 +159,26 @@ class UiLoader(QtUiTools.QUiLoader):
         """
         className = str(className)
         
-        # create a widget off one of our dynamic classes
-        if className in self.dynamicWidgets:
-            widget = self.dynamicWidgets[className](parent)
-            if parent:
-                widget.setPalette(parent.palette())
-            widget.setObjectName(name)
+        with uiprofiler.span('{0} {1}'.format(className, name), 'widget'):
+            # create a widget off one of our dynamic classes
+            if className in self.dynamicWidgets:
+                widget = self.dynamicWidgets[className](parent)
+                if parent:
+                    with uiprofiler.span('setPalette', 'palette'):
+                        widget.setPalette(parent.palette())
+                widget.setObjectName(name)
+                
+                # hack fix on a QWebView (will crash app otherwise)
+                # forces a URL to the QWebView before it finishes
+                if className == 'QWebView':
+                    widget.setUrl(QtCore.QUrl('http://www.google.com'))
             
-            # hack fix on a QWebView (will crash app otherwise)
-            # forces a URL to the QWebView before it finishes
-            if className == 'QWebView':
-                widget.setUrl(QtCore.QUrl('http://www.google.com'))
-        
-        # create a widget from the default system
-        else:
-            widget = super(UiLoader, self).createWidget(className, parent, name)
-            if parent:
-                widget.setPalette(parent.palette())
+            # create a widget from the default system
+            else:
+                widget = super(UiLoader, self).createWidget(className, parent, name)
+                if parent:
+                    with uiprofiler.span('setPalette', 'palette'):
+                        widget.setPalette(parent.palette())
         
         if parent is None:
             return self._baseinstance
@@ -186,6 +202,10 @@ class Uic(object):
         
         :return     <QWidget> || None
         """
+        with uiprofiler.span(filename, 'form'):
+            return self._loadUi(filename, baseinstance)
+
+    def _loadUi(self, filename, baseinstance=None):
         try:
             xui = ElementTree.parse(filename)
         except xml.parsers.expat.ExpatError:
@@ -213,9 +233,10 @@ class Uic(object):
                 
                 # try to use the custom widgets
                 try:
-                    __import__(header)
-                    module = sys.modules[header]
-                    cls = getattr(module, clsname)
+                    with uiprofiler.span('{0}.{1}'.format(header, clsname), 'import'):
+                        __import__(header)
+                        module = sys.modules[header]
+                        cls = getattr(module, clsname)
                 except (ImportError, KeyError, AttributeError):
                     log.error('Could not load %s.%s' % (header, clsname))
                     continue
@@ -225,7 +246,10 @@ class Uic(object):
         
         # load the options
         ui = loader.load(filename)
-        QtCore.QMetaObject.connectSlotsByName(ui)
+        with uiprofiler.span('connectSlotsByName', 'slots'):
+            QtCore.QMetaObject.connectSlotsByName(ui)
+        
+        diagnostics.track(ui, filename)
         return ui
 
 class QDialog(QtGui.QDialog):
@@ -260,6 +284,9 @@ def init(scope):
     
     :param      scope | <dict>
     """
+    # update globals
+    scope['isDeleted'] = isDeleted
+    
     # define wrapper compatibility symbols
     QtCore.THREADSAFE_NONE = XThreadNone()
     QtGui.QDialog = QDialog